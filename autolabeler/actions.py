@@ -59,6 +59,8 @@ class OnMatchFormatAction(BasePostLabellingAction):
             comment_format: str|None=None):
         self._action_format = perform_action_format or ""
         self._comment_format = comment_format or ""
+        self._action_template = expr.CompiledFormatString(self._action_format)
+        self._comment_template = expr.CompiledFormatString(self._comment_format)
 
     def __repr__(self):
         cls = self.__class__.__name__
@@ -94,12 +96,9 @@ class OnMatchFormatAction(BasePostLabellingAction):
     def get_post_labelling_action(self, match: MatchResult) -> PostLabellingAction|None:
         if not self._action_format:
             return None
-        return PostLabellingAction(
-            expr.format_string_with_expressions(
-                self._action_format, match))
+        return PostLabellingAction(self._action_template.format(match))
 
     def get_post_labelling_comment(self, match: MatchResult) -> str|None:
         if not self._comment_format:
             return None
-        return expr.format_string_with_expressions(
-            self._comment_format, match)
+        return self._comment_template.format(match)
@@ -16,12 +16,29 @@
 
 
 import ast
+import functools
 import itertools
 import logging
+import re
+import threading
+import types
+from typing import Iterator, Mapping
 
 
 LOG = logging.getLogger(__name__)
 
+# NOTE(aznashwan): rendered/templated expressions are all distinct strings,
+# so the compiled code objects are only cached for the most recent ones.
+_COMPILED_CODE_CACHE_MAX_SIZE = 1024
+
+# NOTE(aznashwan): safety checks only depend on the statement and the names
+# of the variables, so we remember which combinations have already passed.
+_CHECKED_EXPRESSIONS_MAX_SIZE = 1024
+_CHECKED_EXPRESSIONS: dict[tuple[str, frozenset], None] = {}
+_CHECKED_EXPRESSIONS_LOCK = threading.Lock()
+
+_FORMAT_BRACES_REGEX = re.compile(r"[{}]")
+
 DEFAULT_ALLOWED_IMPORTS = list(itertools.chain(*[
     [
         # Stdlib utility modules we'd always like to offer in full:
@@ -61,28 +78,212 @@ DEFAULT_ALLOWED_IMPORTS = list(itertools.chain(*[
 ]))
 
 
-def _get_first_format_span(string: str) -> dict:
-    start = string.find("{")
-    if start < 0:
-        return {}
-
+def _iter_format_spans(string: str) -> Iterator[tuple[int, int]]:
+    """ Yields the (start, end) indices of each pair of outermost balanced
+    braces in the string, scanning all the braces in a single pass. """
+    start = -1
     opened_inner_braces = 0
-    for i, c in enumerate(string[start+1:]):
-        if opened_inner_braces < 0:
-            break
-
-        if c == "{":
-            opened_inner_braces += 1
+    for brace in _FORMAT_BRACES_REGEX.finditer(string):
+        if brace.group() == "{":
+            if start < 0:
+                start = brace.start()
+            else:
+                opened_inner_braces += 1
             continue
-        if c == "}":
-            if opened_inner_braces == 0:
-                return {
-                    "start": start,
-                    "end": start + i + 1}
+        if start < 0:
+            # NOTE(aznashwan): stray closing braces are left as is.
+            continue
+        if opened_inner_braces == 0:
+            yield start, brace.start()
+            start = -1
+        else:
             opened_inner_braces -= 1
 
-    raise SyntaxError(
-        f"Provided format string has inbalanced braces: {string}")
+    if start >= 0:
+        raise SyntaxError(
+            f"Provided format string has inbalanced braces: {string}")
+
+
+@functools.lru_cache(maxsize=_COMPILED_CODE_CACHE_MAX_SIZE)
+def _compiled_cache(src: str, mode: str) -> types.CodeType:
+    """ Compiles the given source, caching the code object in-process.
+
+    NOTE(aznashwan): code objects are deliberately never persisted, as
+    the safety checks run on the source, not on whatever gets loaded.
+    """
+    return compile(src, __name__, mode)
+
+
+def get_format_string_expressions(string: str) -> list[str]:
+    """ Returns the list of stripped statements within the braces of the
+    given format string, in the order they appear in the string.
+    """
+    if "{" not in string:
+        return []
+    return [
+        string[start+1:end].strip()
+        for start, end in _iter_format_spans(string)]
+
+
+def get_dereferenced_names(
+        statement: str, safe_attributes: list[str]|None=None) -> set[str]:
+    """ Returns the set of variable names which the given statement will
+    always access an attribute/subscript of when evaluated.
+
+    Names only dereferenced within short-circuiting sub-expressions (the
+    latter operands of `and`/`or`, conditional expression branches, or
+    comprehension bodies) are NOT returned.
+
+    param safe_attributes: attribute names which are always defined on
+    the variables and thus should not count as dereferences.
+    """
+    safe = set(safe_attributes or [])
+    names = set()
+
+    def _walk(node: ast.AST):
+        match node:
+            case ast.BoolOp():
+                _walk(node.values[0])
+                return
+            case ast.IfExp():
+                _walk(node.test)
+                return
+            case ast.ListComp() | ast.SetComp() | ast.DictComp() | ast.GeneratorExp():
+                _walk(node.generators[0].iter)
+                return
+            case ast.Lambda():
+                return
+            case ast.Attribute(value=ast.Name(id=name), attr=attr) if attr not in safe:
+                names.add(name)
+            case ast.Subscript(value=ast.Name(id=name)):
+                names.add(name)
+        for child in ast.iter_child_nodes(node):
+            _walk(child)
+
+    _walk(ast.parse(statement, mode='eval', filename=__name__))
+    return names
+
+
+class CompiledStatement():
+    """ Expression statement which is compiled once for repeated evaluation. """
+
+    def __init__(self, statement: str):
+        self._statement = statement.strip()
+        self._code = None
+        self._body = None
+        self._error = None
+        try:
+            self._code = _compiled_cache(self._statement, "eval")
+            self._body = ast.parse(
+                self._statement, mode='eval', filename=__name__).body
+        except SyntaxError as ex:
+            # NOTE(aznashwan): invalid statements only error out when run.
+            self._error = ex
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self._statement!r})"
+
+    def get_statement(self) -> str:
+        return self._statement
+
+    def get_names(self) -> set[str]:
+        """ Returns all the variable names referenced by the statement. """
+        if self._body is None:
+            return set()
+        return {
+            node.id for node in ast.walk(self._body)
+            if isinstance(node, ast.Name)}
+
+    def check(self, variables: dict):
+        """ Checks whether the statement is safe to run with the variables. """
+        key = (self._statement, frozenset(variables))
+        if key in _CHECKED_EXPRESSIONS:
+            return
+
+        _check_banned_strings(self._statement)
+        if self._error:
+            raise self._error.__class__(str(self._error))
+        _check_expression_safety(
+            self._body, variables, builtins=_SAFE_BUILTINS)  # pyright: ignore
+        _mark_expression_checked(key)
+
+    def evaluate(self, variables: dict, builtins: Mapping|None=None) -> object:
+        """ Evaluates the statement and returns the resulting object.
+
+        NOTE: does NOT check the statement, `check()` should be called first.
+        """
+        if self._error:
+            raise self._error.__class__(str(self._error))
+        if builtins is None:
+            builtins = _SAFE_BUILTINS
+
+        globs = {k: v for k, v in variables.items()}
+        globs["__builtins__"] = builtins
+        return eval(self._code, globs, {})  # pyright: ignore
+
+
+class CompiledFormatString():
+    """ Format string which is parsed once into its literal parts and
+    compiled statements for repeated formatting.
+    """
+
+    def __init__(self, string: str):
+        self._string = string
+        self._literals = []
+        self._statements = []
+        self._error = None
+        if "{" not in string:
+            # NOTE(aznashwan): most label names/descriptions are plain strings.
+            self._literals.append(string)
+            return
+        try:
+            self._parse()
+        except SyntaxError as ex:
+            # NOTE(aznashwan): unbalanced format strings only error out when run.
+            self._error = ex
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self._string!r})"
+
+    def _parse(self):
+        pos = 0
+        for start, end in _iter_format_spans(self._string):
+            self._literals.append(self._string[pos:start])
+            self._statements.append(
+                CompiledStatement(self._string[start+1:end]))
+            pos = end + 1
+        self._literals.append(self._string[pos:])
+
+    def get_string(self) -> str:
+        return self._string
+
+    def format(self, variables: dict) -> str:
+        """ Runs all statements in the format string, calls str() on their
+        results, and formats them back into the original string.
+        """
+        if self._error:
+            raise self._error.__class__(str(self._error))
+        if not self._statements:
+            return self._literals[0]
+
+        builtins = _get_safe_builtins()
+        parts = [self._literals[0]]
+        for statement, literal in zip(self._statements, self._literals[1:]):
+            statement.check(variables)
+            try:
+                expr_res = statement.evaluate(variables, builtins=builtins)
+            except (NameError, SyntaxError) as ex:
+                raise ex.__class__(
+                    f"Failed to run statement '{statement.get_statement()}' "
+                    f"from format '{self._string}': {ex}") from ex
+            parts.append(str(expr_res))
+            parts.append(literal)
+
+        result = "".join(parts)
+        LOG.debug(
+            "Successfully processed statement '%s' into '%s' "
+            "with variables: %s", self._string, result, variables)
+        return result
 
 
 def format_string_with_expressions(string: str, variables: dict) -> str:
@@ -91,33 +292,9 @@ def format_string_with_expressions(string: str, variables: dict) -> str:
 
     E.g.: "this is a { var.field } format".format({"var": {"field": "example"}})
     """
-    result = ""
-    search_pos = 0
-    while True:
-        span = _get_first_format_span(string[search_pos:])
-        if not span:
-            result = f"{result}{string[search_pos:]}"
-            break
-        span_start = span["start"]
-        span_end = span["end"]
-        result = f"{result}{string[search_pos:search_pos+span_start]}"
-
-        statement = string[search_pos+span_start+1: search_pos+span_end].strip()  # strip braces
-        check_string_expression(statement, variables)
-        try:
-            expr_res = evaluate_string_expression(statement, variables)
-        except (NameError, SyntaxError) as ex:
-            raise ex.__class__(
-                f"Failed to run statement '{statement}' from format '{string}': "
-                f"{ex}") from ex
-
-        result = f"{result}{expr_res}"
-        search_pos = search_pos + span_end + 1
-
-    LOG.debug(
-        f"Successfully processed statement '{string}' into '{result}' "
-        f"with variables: {variables}")
-    return result
+    if "{" not in string:
+        return string
+    return CompiledFormatString(string).format(variables)
 
 
 def evaluate_string_expression(
@@ -130,11 +307,10 @@ def evaluate_string_expression(
 
     globs = {k: v for k, v in variables.items()}
     globs["__builtins__"] = builtins
-    return eval(statement, globs, {})
+    return eval(_compiled_cache(statement, "eval"), globs, {})
 
 
-def check_string_expression(statement: str, variables: dict):
-    """ Checks whether a string expression is safe to run. """
+def _check_banned_strings(statement: str):
     banned_strings = ["__loader__"]
     present = [s for s in banned_strings if s in statement]
     if present:
@@ -142,9 +318,27 @@ def check_string_expression(statement: str, variables: dict):
             f"Cannot use any of the following banned string in statement "
             f"{statement}: {present}")
 
+
+def _mark_expression_checked(key: tuple[str, frozenset]):
+    # NOTE: labelers may be run concurrently, so the eviction is guarded.
+    with _CHECKED_EXPRESSIONS_LOCK:
+        if len(_CHECKED_EXPRESSIONS) >= _CHECKED_EXPRESSIONS_MAX_SIZE:
+            # Evict the oldest entry:
+            _CHECKED_EXPRESSIONS.pop(next(iter(_CHECKED_EXPRESSIONS)), None)
+        _CHECKED_EXPRESSIONS[key] = None
+
+
+def check_string_expression(statement: str, variables: dict):
+    """ Checks whether a string expression is safe to run. """
+    key = (statement, frozenset(variables))
+    if key in _CHECKED_EXPRESSIONS:
+        return
+
+    _check_banned_strings(statement)
     expr = ast.parse(statement, mode='eval', filename=__name__)
-    return _check_expression_safety(
+    _check_expression_safety(
         expr.body, variables, builtins=_get_safe_builtins())
+    _mark_expression_checked(key)
 
 
 def check_imports_for_definitions(
@@ -197,7 +391,7 @@ def evaluate_string_definitions(
     safe_builtins = {}
     safe_builtins.update(variables)
     locals = {}
-    exec(definitions, safe_builtins, locals)
+    exec(_compiled_cache(definitions, "exec"), safe_builtins, locals)
 
     if scrub_imports:
         locals = {k: locals[k] for k in locals if k not in imported_names}
@@ -205,7 +399,7 @@ def evaluate_string_definitions(
     return locals
 
 
-def _get_safe_builtins() -> dict:
+def _build_safe_builtins() -> types.MappingProxyType:
     forbidden = [
         "__import__", "__loader__", "breakpoint", "compile",
         "eval", "exec", "exit", "open", "input", "copyright",
@@ -215,7 +409,15 @@ def _get_safe_builtins() -> dict:
     for item in forbidden:
         _ = builtins_copy.pop(item, None)
 
-    return builtins_copy
+    # NOTE(aznashwan): read-only so it can be shared between all evaluations.
+    return types.MappingProxyType(builtins_copy)
+
+
+_SAFE_BUILTINS = _build_safe_builtins()
+
+
+def _get_safe_builtins() -> types.MappingProxyType:
+    return _SAFE_BUILTINS
 
 
 def _validate_function_call(call: ast.Call, values: dict, builtins=None):
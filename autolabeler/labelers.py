@@ -13,11 +13,12 @@
 #    under the License.
 
 import abc
+import collections
+import concurrent.futures
 import dataclasses
-import itertools
 import logging
-import traceback
-from typing import Self
+import sys
+from typing import Iterator, Mapping, Self, Sequence
 
 from github.Issue import Issue
 from github.Label import Label
@@ -36,23 +37,36 @@ OPTIONS_MAGIC_KEY = "__opts__"
 DEFINITIONS_MAGIC_KEY = "__defs__"
 
 
-@dataclasses.dataclass
+def _is_leaf(val: object) -> bool:
+    """ Returns whether the given config value is a labeler definition. """
+    return isinstance(val, dict) and "color" in val and "description" in val
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
 class LabelParams:
     name: str
     color: str
     description: str
-    post_labelling_action: actions.PostLabellingAction|None = None
-    post_labelling_comment: str|None = None
-
-    def __init__(
-            self, name: str, color: str, description: str,
-            post_labelling_comment: str|None=None,
-            post_labelling_action: actions.PostLabellingAction|None=None):
-        self.name = name
-        self.color = color
-        self.description = description.strip()
-        self.post_labelling_action = post_labelling_action
-        self.post_labelling_comment = post_labelling_comment
+    # NOTE(aznashwan): labels are compared by definition only.
+    post_labelling_comment: str|None = \
+        dataclasses.field(default=None, compare=False)
+    post_labelling_action: actions.PostLabellingAction|None = \
+        dataclasses.field(default=None, compare=False)
+    _hash: int = dataclasses.field(
+        default=0, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # NOTE(aznashwan): label names/colors are low-cardinality and
+        # used as dict keys throughout, so we intern them.
+        object.__setattr__(self, "name", sys.intern(self.name))
+        object.__setattr__(self, "color", sys.intern(self.color))
+        object.__setattr__(self, "description", self.description.strip())
+        # NOTE(aznashwan): labels are immutable, so we hash them only once.
+        object.__setattr__(
+            self, "_hash", hash((self.name, self.color, self.description)))
+
+    def __hash__(self) -> int:
+        return self._hash
 
     @classmethod
     def from_label(cls, label: Label) -> Self:
@@ -88,24 +102,31 @@ class LabelParams:
     def to_label_creation_params(self) -> dict[str, str]:
         return self.to_dict()
 
-    def __eq__(self, other: Self) -> bool:
-        if not isinstance(other, self.__class__):
-            return False
-        return self.name == other.name and \
-               self.color == other.color and \
-               self.description == other.description
-
 
 class BaseLabeler(metaclass=abc.ABCMeta):
     """ ABC offering independent labelling behavior for each Github resource type.
     """
+    __slots__ = ()
 
     @abc.abstractmethod
-    def get_labels_for_object(self, obj: Repository|PullRequest|Issue):
+    def get_labels_for_object(
+            self, obj: Repository|PullRequest|Issue,
+            cache: dict|None=None) -> Sequence[LabelParams]:
+        """ Returns the labels for the given object. The optional `cache`
+        dict may be shared between labelers to reuse selector matches. """
+        _ = cache
         raise NotImplemented("No labelling implementation.")
 
 
 class SelectorLabeler(BaseLabeler):
+    # NOTE(aznashwan): one instance is created for every label definition.
+    __slots__ = (
+        "_name", "_color", "_description", "_custom_options",
+        "_custom_definitions", "_selectors", "_condition", "_actioner",
+        "_name_template", "_description_template", "_condition_statement",
+        "_required_selectors", "_condition_is_prefilter", "_is_static",
+        "_static_label", "_static_labels", "_repo_label", "_repo_labels")
+
     def __init__(self,
                  label_name: str,
                  label_color: str,
@@ -123,6 +144,30 @@ class SelectorLabeler(BaseLabeler):
         self._selectors = selectors_list or []
         self._condition = condition
         self._actioner = actioner
+        self._name_template = expr.CompiledFormatString(self._name)
+        self._description_template = expr.CompiledFormatString(self._description)
+        self._condition_statement = None
+        if condition:
+            self._condition_statement = expr.CompiledStatement(condition)
+        self._required_selectors = self._get_required_selectors()
+        self._condition_is_prefilter = self._get_condition_is_prefilter()
+
+        # NOTE(aznashwan): static labels never change, so we only build them once.
+        self._is_static = (
+            not self._selectors and not self._condition
+            and "{" not in self._name and "{" not in self._description)
+        self._static_label = None
+        if self._is_static:
+            self._static_label = LabelParams(
+                self._name, self._color, self._description)
+        self._repo_label = self._get_repo_label()
+        # NOTE(aznashwan): immutable results can be returned to all callers.
+        self._static_labels = ()
+        if self._static_label:
+            self._static_labels = (self._static_label,)
+        self._repo_labels = ()
+        if self._repo_label:
+            self._repo_labels = (self._repo_label,)
 
     def __repr__(self):
         cls = self.__class__.__name__
@@ -152,7 +197,7 @@ class SelectorLabeler(BaseLabeler):
         """
         required_fields = [
             "color", "description"]
-        if not type(val) is dict:
+        if not isinstance(val, dict):
             raise TypeError(
                 f"Expected dict with keys {required_fields}, "
                 f"got {val} ({type(val)})")
@@ -173,7 +218,7 @@ class SelectorLabeler(BaseLabeler):
                 f"{unsupported}. Supported fields are: {supported_fields}")
 
         sels = []
-        sels_defs = val.get("selectors", {})
+        sels_defs = dict(val.get("selectors") or {})
         # Update the selectors list with first-class repo/issues/prs selectors:
         sels_defs.update({
             special: val[special]
@@ -183,8 +228,9 @@ class SelectorLabeler(BaseLabeler):
             try:
                 scls = selectors.get_selector_cls(sname, raise_if_missing=True)
                 LOG.debug(
-                    f"{cls.__name__}.from_dict(): attempting to load selector "
-                    f"{scls.__name__} from value {val} with options {custom_options}")
+                    "%s.from_dict(): attempting to load selector %s from "
+                    "value %s with options %s",
+                    cls.__name__, scls.__name__, val, custom_options)
                 sels.append(scls.from_val(sbody, extra=custom_options))
             except Exception as ex:
                 raise ValueError(
@@ -202,88 +248,207 @@ class SelectorLabeler(BaseLabeler):
             custom_options=custom_options,
             custom_definitions=custom_definitions)
 
-    def _run_selectors(self, obj: Issue|PullRequest|Repository) -> dict:
+    def _get_selector_dependent_names(self) -> set[str]:
+        """ Returns the names of the selectors which are not shadowed by
+        any custom definitions or options. """
+        selector_names = {s.get_selector_name() for s in self._selectors}
+        # NOTE(aznashwan): custom definitions and options shadow selectors:
+        selector_names.difference_update(self._custom_definitions)
+        selector_names.discard("opts")
+        return selector_names
+
+    def _get_condition_is_prefilter(self) -> bool:
+        """ Returns whether the condition does not reference any selectors,
+        and can thus be checked before running the selectors at all. """
+        if not self._selectors or not self._condition_statement:
+            return False
+        return not self._condition_statement.get_names().intersection(
+            self._get_selector_dependent_names())
+
+    def _get_base_variables(self) -> dict:
+        """ Returns the custom definitions and options which are available
+        to all statements regardless of selector matches. """
+        base_dict = dict(self._custom_definitions)
+
+        # Add any custom options in the statement:
+        opts_key = 'opts'
+        if opts_key in base_dict:
+            LOG.error(
+                f"{self}: Skipping definitions key {opts_key} already present in "
+                f"match result set: {base_dict}")
+        else:
+            base_dict[opts_key] = self._custom_options
+        return base_dict
+
+    def _condition_rejects_all(self) -> bool:
+        """ Returns True if the selector-independent condition fails, in
+        which case no labels could be generated regardless of matches. """
+        if not self._condition_is_prefilter:
+            return False
+        try:
+            result = self._run_statement(
+                self._condition_statement,  # pyright: ignore
+                self._get_base_variables())
+        except Exception as ex:
+            # NOTE(aznashwan): errors get reported after running the selectors.
+            LOG.debug("%s: failed to pre-check condition: %s", self, ex)
+            return False
+        if not bool(result):
+            LOG.debug(
+                "%s: selector-independent condition '%s' failed with %s, "
+                "skipping running selectors.", self, self._condition, result)
+            return True
+        return False
+
+    def _get_required_selectors(self) -> set[str]:
+        """ Returns the names of the selectors whose matches are always
+        accessed by the name/description/condition statements, and thus
+        must have matched for any label to be generated.
+        """
+        selector_names = self._get_selector_dependent_names()
+        if not selector_names:
+            return set()
+
+        statements = []
+        if self._condition:
+            statements.append(self._condition.strip())
+        required = set()
+        try:
+            for string in (self._name, self._description):
+                statements.extend(expr.get_format_string_expressions(string))
+            for statement in statements:
+                required.update(expr.get_dereferenced_names(
+                    statement, safe_attributes=dir(selectors.MatchResult)))
+        except SyntaxError as ex:
+            # NOTE(aznashwan): invalid statements will error out when
+            # formatting labels, so we need not raise here.
+            LOG.debug("%s: failed to determine required selectors: %s", self, ex)
+            return set()
+
+        return required.intersection(selector_names)
+
+    def _get_repo_label(self) -> LabelParams|None:
+        """ Returns the label to be defined on the repo if its name and
+        description do not depend on any selector matches, else None.
+        """
+        if self._static_label:
+            return self._static_label
+        if "{" not in self._name and "{" not in self._description:
+            return LabelParams(self._name, self._color, self._description)
+
+        try:
+            name = self._name_template.format(self._custom_definitions)
+            desc = self._description_template.format(self._custom_definitions)
+        except Exception as ex:
+            LOG.debug(
+                "%s: label name/description depend on selectors: %s", self, ex)
+            return None
+        return LabelParams(name, self._color, desc)
+
+    def _run_selectors(
+            self, obj: Issue|PullRequest|Repository,
+            cache: dict|None=None) -> dict:
+        # NOTE(aznashwan): selectors defined identically across labelers
+        # have identical reprs, so their results can be reused when a
+        # `cache` is shared between labelers for the same object.
+        if cache is None:
+            cache = {}
+
         # overly-drawn-out code for logging purposes:
         matches = {}
         for selector in self._selectors:
-            res = selector.match(obj)
+            key = (id(obj), selector.__class__.__qualname__, repr(selector))
+            # NOTE(aznashwan): labelers may be run concurrently, so the cache
+            # holds futures which other labelers can wait on.
+            future = concurrent.futures.Future()
+            existing = cache.setdefault(key, future)
+            if existing is future:
+                try:
+                    res = selector.match(obj)
+                except BaseException as ex:
+                    future.set_exception(ex)
+                    raise
+                future.set_result(res)
+                LOG.debug("%s.match(%s) = %s", selector, obj, res)
+            else:
+                res = existing.result()
             matches[selector.get_selector_name()] = res
-            LOG.debug(f"{selector}.match({obj}) = {res}")
         return matches
 
-    def _run_statement(self, statement: str, variables: dict) -> object:
+    def _run_statement(
+            self, statement: expr.CompiledStatement, variables: dict) -> object:
         try:
-            statement = statement.strip()
-            expr.check_string_expression(statement, variables)
-            return expr.evaluate_string_expression(statement, variables)
+            statement.check(variables)
+            return statement.evaluate(variables)
         except (NameError, SyntaxError) as ex:
             raise ex.__class__(
-                f"Failed to run statement '{statement}' with {variables=}: {ex}"
-            ) from ex
+                f"Failed to run statement '{statement.get_statement()}' "
+                f"with {variables=}: {ex}") from ex
 
     def _get_labels_for_selector_matches(
             self,
             selector_matches: dict[str, list[selectors.MatchResult]]
-        ) -> list[LabelParams]:
-        if not self._selectors:
-            # This is a static label and should be returned.
-            return [LabelParams(
-                self._name, self._color, self._description)]
-
-        if self._selectors and not any(selector_matches.values()):
-            # NOTE(aznashwan): if no selector matched at all, return:
-            LOG.debug(f"{self} had no selector matches whatsoever, returning.")
-            return []
-
+        ) -> Sequence[LabelParams]:
+        if self._is_static:
+            return self._static_labels
+
+        # NOTE(aznashwan): single pass over the matches to both check
+        # them and gather them for combining.
+        any_matched = False
+        unmatched = []
         successful_matches = []
-        selector_matches_index_map = {}  # maps index in `selector_matches` to its name
+        selector_names = []  # maps index in `successful_matches` to its name
         for selector, match in selector_matches.items():
-            selector_matches_index_map[len(successful_matches)] = selector
+            selector_names.append(selector)
             if match:
+                any_matched = True
                 successful_matches.append(match)
             else:
+                if selector in self._required_selectors:
+                    unmatched.append(selector)
                 # NOTE(aznashwan): defaulting non-matching selectors to empty dict
                 # so they can be checked within statements without a NameError.
                 successful_matches.append([selectors.MatchResult({})])
 
-        new_labels_map = {}
-        for match_set in itertools.product(*successful_matches):
-            # The match_dict will map selector names to their results.
-            match_dict = {
-                selector_matches_index_map[i]: selector_match
-                for i, selector_match in enumerate(match_set)}
-
-            # Add any custom definitions to the match result so it
-            # may be accessed from within format statements:
-            match_dict.update(self._custom_definitions)
-
-            # Add any custom options in the statement:
-            opts_key = 'opts'
-            if opts_key in match_dict:
-                LOG.error(
-                    f"{self}: Skipping definitions key {opts_key} already present in "
-                    f"match result set: {match_dict}")
-            else:
-                match_dict[opts_key] = self._custom_options
+        if not any_matched:
+            # NOTE(aznashwan): if no selector matched at all, return:
+            LOG.debug("%s had no selector matches whatsoever, returning.", self)
+            return []
+
+        if unmatched:
+            LOG.debug(
+                "%s: required selectors %s had no matches, returning.",
+                self, unmatched)
+            return []
+
+        # Add any custom definitions and options to the match result
+        # so they may be accessed from within format statements:
+        base_dict = self._get_base_variables()
 
+        new_labels_map = {}
+        # NOTE(aznashwan): the match_dict will map selector names to their
+        # results and is updated in place for each combination of matches.
+        for match_dict in _iter_match_combinations(
+                selector_names, successful_matches, base_dict,
+                fixed_names=self._custom_definitions):
             new = None
             LOG.debug(
-                f"{self}._get_labels_for_selector_matches(): attempting to format "
-                f"with selectors match values: {match_dict}")
+                "%s._get_labels_for_selector_matches(): attempting to format "
+                "with selectors match values: %s", self, match_dict)
             try:
-                name = expr.format_string_with_expressions(
-                    self._name, match_dict)
-                description = expr.format_string_with_expressions(
-                    self._description, match_dict)
-                if self._condition:
+                # NOTE(aznashwan): the condition is checked first so we
+                # don't format the name/description of rejected matches.
+                if self._condition_statement:
                     condition_result = self._run_statement(
-                        self._condition, match_dict)
+                        self._condition_statement, match_dict)
                     if not bool(condition_result):
                         LOG.debug(
-                            f"{self}: conditional check for '{self._condition}' "
-                            f"failed with {condition_result} for match set: "
-                            f"{match_set}")
+                            "%s: conditional check for '%s' failed with %s "
+                            "for match set: %s", self, self._condition,
+                            condition_result, match_dict)
                         continue
+                name = self._name_template.format(match_dict)
+                description = self._description_template.format(match_dict)
                 post_action = None
                 post_comment = None
                 if self._actioner:
@@ -295,43 +460,49 @@ class SelectorLabeler(BaseLabeler):
                     post_labelling_action=post_action,
                     post_labelling_comment=post_comment)
             except Exception as e:
+                # NOTE(aznashwan): only pay for the traceback when debugging.
                 LOG.error(
                     f"{self}: skipping error formatting label params "
-                    f"with match values: {match_dict}: "
-                    f"{e}\n{traceback.format_exc()}")
+                    f"with match values: {match_dict}: {e}",
+                    exc_info=LOG.isEnabledFor(logging.DEBUG))
             if not new:
                 continue
 
-            if new.name in new_labels_map and new_labels_map[new.name] != new:
-                LOG.warning(
-                    f"{self} got conflicting colors/descriptions for label "
-                    f"{new.name}: value already present {new_labels_map.get(new.name)}"
-                    f" is different from new value: {new}")
-
-            new_labels_map[new.name] = new
+            existing = new_labels_map.setdefault(new.name, new)
+            if existing is not new:
+                # NOTE(aznashwan): differing hashes spare the full comparison.
+                if hash(existing) != hash(new) or existing != new:
+                    LOG.warning(
+                        f"{self} got conflicting colors/descriptions for label "
+                        f"{new.name}: value already present {existing}"
+                        f" is different from new value: {new}")
+                new_labels_map[new.name] = new
 
         LOG.debug(
-            f"{self}._get_labels_for_selector_matches(): Returning following labels "
-            f"{new_labels_map} for selector matches: {selector_matches}")
+            "%s._get_labels_for_selector_matches(): Returning following labels "
+            "%s for selector matches: %s", self, new_labels_map, selector_matches)
         return list(new_labels_map.values())
 
-    def _get_labels_for_repo(self, repo: Repository) -> list[LabelParams]:
+    def _get_labels_for_repo(
+            self, repo: Repository,
+            cache: dict|None=None) -> Sequence[LabelParams]:
         # If this a simple label with a static name, it always applies to the repo.
-        try:
-            name = expr.format_string_with_expressions(
-                self._name, self._custom_definitions)
-            desc = expr.format_string_with_expressions(
-                self._description, self._custom_definitions)
-            return [LabelParams(name, self._color, desc)]
-        except Exception as ex:
-            LOG.debug(
-                f"{self}.get_labels_for_repo({repo}): failed to format "
-                f"label name/description. Running selectors: {ex}")
-            # Else, we must run and generate the selectors:
-            return self._get_labels_for_selector_matches(
-                self._run_selectors(repo))
+        if self._repo_label:
+            return self._repo_labels
+
+        if self._condition_rejects_all():
+            return []
+
+        # Else, we must run and generate the selectors:
+        LOG.debug(
+            "%s.get_labels_for_repo(%s): label name/description "
+            "depend on selectors. Running selectors.", self, repo)
+        return self._get_labels_for_selector_matches(
+            self._run_selectors(repo, cache=cache))
 
-    def _get_nonstatic_labels(self, obj: PullRequest|Issue):
+    def _get_nonstatic_labels(
+            self, obj: PullRequest|Issue,
+            cache: dict|None=None) -> Sequence[LabelParams]:
         # TODO(aznashwan): separate `StaticLabeler` class.
         # NOTE(aznashwan): this prevents static labellers with no selectors
         # being from applied to all PRs/Issues.
@@ -340,33 +511,67 @@ class SelectorLabeler(BaseLabeler):
                 f"{self}._get_nonstatic_labels({obj}) has no selectors "
                 "no non-static labels to return.")
             return []
+        if self._condition_rejects_all():
+            return []
 
         return self._get_labels_for_selector_matches(
-            self._run_selectors(obj))
+            self._run_selectors(obj, cache=cache))
 
-    def get_labels_for_object(self, obj: Repository|PullRequest|Issue) -> list[LabelParams]:
+    def get_labels_for_object(
+            self, obj: Repository|PullRequest|Issue,
+            cache: dict|None=None) -> Sequence[LabelParams]:
         if isinstance(obj, Repository):
-            return self._get_labels_for_repo(obj)
-        return self._get_nonstatic_labels(obj)
+            return self._get_labels_for_repo(obj, cache=cache)
+        return self._get_nonstatic_labels(obj, cache=cache)
 
 
+def _iter_match_combinations(
+        names: list[str], matches: list[list], match_dict: dict,
+        fixed_names: Mapping|set|None=None) -> Iterator[dict]:
+    """ Iterates odometer-style through the cartesian product of the given
+    lists of matches, setting the current match for each of the `names`
+    in the provided `match_dict` and yielding it.
 
-def load_labelers_from_config(
-        config: dict, prefix: str="", separator: str="/",
-        custom_options: dict|None=None,
-        custom_definitions: dict|None=None,
-        options_magic_key: str=OPTIONS_MAGIC_KEY,
-        definitions_magic_key: str=DEFINITIONS_MAGIC_KEY) -> list[BaseLabeler]:
-    """ Recursively loads labelers from the given config dict.
-
-    The special magic keys can be repeated within each dict
-    nested dict for "layering" of said config.
+    NOTE: the same `match_dict` is updated in place and yielded on every
+    step, so callers must copy it should they need to retain it.
+    Names present in `fixed_names` are never overwritten.
     """
-    if not custom_definitions:
-        custom_definitions = {}
-    if not custom_options:
-        custom_options = {}
-
+    if not names or any(not m for m in matches):
+        return
+
+    fixed_names = fixed_names or set()
+    count = len(names)
+    writable = [name not in fixed_names for name in names]
+    indices = [0] * count
+    for i in range(count):
+        if writable[i]:
+            match_dict[names[i]] = matches[i][0]
+
+    while True:
+        yield match_dict
+
+        # Advance the rightmost index, carrying over to the left:
+        pos = count - 1
+        while pos >= 0:
+            indices[pos] += 1
+            if indices[pos] < len(matches[pos]):
+                break
+            indices[pos] = 0
+            pos -= 1
+        if pos < 0:
+            return
+
+        for i in range(pos, count):
+            if writable[i]:
+                match_dict[names[i]] = matches[i][indices[i]]
+
+
+def _load_config_section(
+        config: dict, separator: str,
+        custom_options: Mapping, custom_definitions: Mapping,
+        options_magic_key: str, definitions_magic_key: str) -> tuple:
+    """ Returns the separator, options and definitions for the given
+    config section, layered on top of the provided ones. """
     if not isinstance(config, dict):
         raise ValueError(
             "Failed to recursively parse config: got to the following "
@@ -374,59 +579,114 @@ def load_labelers_from_config(
             f"containing a 'color' and 'description' field: {config}")
 
     # Evaluate and "merge" any added options in this config section.
-    options = config.pop(options_magic_key, {})
-    curr_options = utils.merge_dicts(custom_options, options)
+    options = config.get(options_magic_key, {})
+    curr_options = _layer_mapping(options, custom_options)
     separator = curr_options.get("separator", separator)
 
     # Evaluate and "merge" any added definitions in this config section.
     curr_defs = custom_definitions
-    custom_defs_str = config.pop(definitions_magic_key, "")
+    custom_defs_str = config.get(definitions_magic_key, "")
     if custom_defs_str:
         new_defs = expr.evaluate_string_definitions(
             custom_defs_str, curr_defs, scrub_imports=True,
             allowed_import_names=expr.DEFAULT_ALLOWED_IMPORTS)
-        curr_defs = utils.merge_dicts(curr_defs, new_defs)
+        curr_defs = _layer_mapping(new_defs, curr_defs)
 
-    required_labeler_keys = ['color', 'description']
+    return separator, curr_options, curr_defs
+
+
+def _layer_mapping(new: Mapping, old: Mapping) -> collections.ChainMap:
+    """ Returns a ChainMap with `new` shadowing `old`, keeping the maps
+    of nested layers flat so lookups don't recurse through each layer. """
+    if isinstance(old, collections.ChainMap):
+        return old.new_child(new)  # pyright: ignore
+    return collections.ChainMap(new, old)
+
+
+def load_labelers_from_config(
+        config: dict, prefix: str="", separator: str="/",
+        custom_options: Mapping|None=None,
+        custom_definitions: Mapping|None=None,
+        options_magic_key: str=OPTIONS_MAGIC_KEY,
+        definitions_magic_key: str=DEFINITIONS_MAGIC_KEY) -> list[BaseLabeler]:
+    """ Loads labelers from the given config dict and all its nested sections.
+
+    The special magic keys can be repeated within each dict
+    nested dict for "layering" of said config.
+
+    The provided config is not modified in any way. Options and definitions
+    are layered lazily, with inner sections shadowing outer ones.
+    """
+    if not custom_definitions:
+        custom_definitions = {}
+    if not custom_options:
+        custom_options = {}
+
+    magic_keys = (options_magic_key, definitions_magic_key)
     labelers = []
-    for key, val in config.items():
+
+    # NOTE(aznashwan): nested sections are walked depth-first using an explicit
+    # stack of frames so deeply-nested prefixes don't each add a Python call
+    # frame and intermediate list. Each frame holds: [items iterator, prefix,
+    # separator, section's parent options, section options, section defs]
+    separator, curr_options, curr_defs = _load_config_section(
+        config, separator, custom_options, custom_definitions, *magic_keys)
+    stack = [[
+        iter(config.items()), prefix,
+        separator, custom_options, curr_options, curr_defs]]
+    while stack:
+        frame = stack[-1]
+        items, prefix, separator, parent_options, curr_options, curr_defs = frame
+        item = next(items, None)
+        if item is None:
+            stack.pop()
+            continue
+
+        key, val = item
+        if key in magic_keys:
+            continue
         if not isinstance(val, dict):
             raise ValueError(
                 "Failed to recursively parse config: got to the following "
                 "non-mapping object in hopes it would be a labeler definition "
                 f"containing a 'color' and 'description' field: {val}")
 
-
         name = key
 
-        labeler_options_defs = val.pop(options_magic_key, {})
-        labeler_options = utils.merge_dicts(custom_options, labeler_options_defs)
+        labeler_options_defs = val.get(options_magic_key, {})
+        labeler_options = _layer_mapping(labeler_options_defs, parent_options)
         separator = labeler_options.get("separator", separator)
+        # NOTE(aznashwan): a labeler's separator applies to its later siblings.
+        frame[2] = separator
 
         if prefix:
             name = f"{prefix}{separator}{key}"
-        if all(k in val for k in required_labeler_keys):
-            labeler_defs = {k: v for k, v in curr_defs.items()}
-            labeler_defs_str = val.pop(definitions_magic_key, "")
+        if _is_leaf(val):
+            labeler_defs = curr_defs
+            labeler_defs_str = val.get(definitions_magic_key, "")
             if labeler_defs_str:
                 new_defs = expr.evaluate_string_definitions(
                     labeler_defs_str, labeler_defs, scrub_imports=True,
                     allowed_import_names=expr.DEFAULT_ALLOWED_IMPORTS)
-                labeler_defs = utils.merge_dicts(labeler_defs, new_defs)
+                labeler_defs = _layer_mapping(new_defs, labeler_defs)
 
+            labeler_def = {
+                k: v for k, v in val.items() if k not in magic_keys}
             LOG.debug(
-                f"load_labelers_from_config(): attempting to define labeler "
-                f"with name '{name}' with payload {val} and custom defs: "
-                f"{labeler_defs}")
+                "load_labelers_from_config(): attempting to define labeler "
+                "with name '%s' with payload %s and custom defs: %s",
+                name, labeler_def, labeler_defs)
             labelers.append(
                 SelectorLabeler.from_dict(
-                    name, val,
-                    custom_options=labeler_options,
-                    custom_definitions=labeler_defs))
+                    name, labeler_def,
+                    custom_options=dict(labeler_options),
+                    custom_definitions=dict(labeler_defs)))
         else:
-            labelers.extend(load_labelers_from_config(
-                val, prefix=name, separator=separator,
-                custom_options=curr_options,
-                custom_definitions=curr_defs))
+            section_separator, section_options, section_defs = \
+                _load_config_section(
+                    val, separator, curr_options, curr_defs, *magic_keys)
+            stack.append([
+                iter(val.items()), name,
+                section_separator, curr_options, section_options, section_defs])
 
     return labelers
@@ -13,23 +13,27 @@
 #    under the License.
 
 import argparse
+import dataclasses
 import json
 import logging
 import os
 import sys
 from io import IOBase
 
-import github
 import yaml
 
-from autolabeler import manager
 from autolabeler import utils
 
 
-utils.setupLogging()
-
 LOG = logging.getLogger(__name__)
 
+HTTP_CACHE_PATH = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+    "autolabeler", "http")
+
+# Maximum number of items GitHub's REST API returns per page of a listing.
+MAX_ITEMS_PER_PAGE = 100
+
 
 def _add_arguments(parser: argparse.ArgumentParser) -> argparse.ArgumentParser:
     if not parser:
@@ -49,8 +53,10 @@ def _add_arguments(parser: argparse.ArgumentParser) -> argparse.ArgumentParser:
               "- generate: generates labels based on the config and prints them"
               "- sync: syncs labels based on the config"
               "- purge: removes all labels defined in the config from the target")
+    # NOTE(aznashwan): the 'GITHUB_TOKEN' default is read in `main_with_args`
+    # so the parser itself can be built once at import time.
     parser.add_argument(
-        "-t", "--github-token", default=os.environ.get("GITHUB_TOKEN"),
+        "-t", "--github-token", default=None,
         help="String GitHub API token to make labelling API calls. "
              "It can be both a 'classic' GitHub token, or a new "
              "'fine-grained' GitHub token which includes R/W access to "
@@ -62,6 +68,13 @@ def _add_arguments(parser: argparse.ArgumentParser) -> argparse.ArgumentParser:
         "-a", "--run-post-labelling-actions", action='store_true', default=False,
         help="Whether or not to run any post-labelling actions as denoted by the "
              "'action:' clauses defined on labels.")
+    parser.add_argument(
+        "--http-cache", action='store_true', default=False,
+        help="Cache GitHub API responses in a local plaintext SQLite file "
+             f"at '{HTTP_CACHE_PATH}.sqlite' (honoring $XDG_CACHE_HOME). "
+             "Requires 'requests-cache' to be installed. Cached responses "
+             "are always revalidated using their ETags, but are NOT tied "
+             "to the token used, so do not enable it on shared machines.")
     # parser.add_argument(
     #     "-r", "--replies-definitions-file", type=argparse.FileType('r'),
     #     help="String path to a JSON/YAML file containing issue/PR autoreply "
@@ -70,29 +83,87 @@ def _add_arguments(parser: argparse.ArgumentParser) -> argparse.ArgumentParser:
     return parser
 
 
+# NOTE(aznashwan): the parser is immutable once built, so we only build it once.
+_PARSER = _add_arguments(argparse.ArgumentParser(
+    "github-autolabeler",
+    # NOTE(aznashwan): allows loading arguments from files, one per line,
+    # by passing '@path/to/args.txt'.
+    fromfile_prefix_chars='@',
+    description="Python 3 utility for automatically labelling/triaging "
+                "GitHub issues and pull requests."))
+
+# Prefer the LibYAML-backed loader when PyYAML was built with it:
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
 def load_yaml_file(path_or_file: str|IOBase) -> dict:
-    file = path_or_file
     if isinstance(path_or_file, str):
-        file = open(path_or_file, 'r')
-    return yaml.safe_load(file)
+        with open(path_or_file, 'r') as fin:
+            return yaml.load(fin, Loader=_YAML_LOADER)
+    return yaml.load(path_or_file, Loader=_YAML_LOADER)  # pyright: ignore
 
 
-def main_with_args(argv: list[str]) -> list[dict]:
-    parser = argparse.ArgumentParser(
-        "github-autolabeler",
-        description="Python 3 utility for automatically labelling/triaging "
-                    "GitHub issues and pull requests.")
+def setup_http_cache(cache_path: str=HTTP_CACHE_PATH) -> bool:
+    """ Installs a persistent cache for all GitHub API GET requests.
 
-    parser = _add_arguments(parser)
+    Cached responses are always revalidated through conditional requests
+    using their ETags, so writes made to the labels/issues/PRs are always
+    observed by subsequent reads, while unchanged resources cost a cheap
+    '304 Not Modified' which does not count against the API rate limit.
 
-    args = parser.parse_args(argv)
+    NOTE: responses are stored unencrypted in '<cache_path>.sqlite' and are
+    not keyed on the token, which is why the cache is strictly opt-in.
+
+    Returns whether the cache could be installed.
+    """
+    try:
+        import requests_cache
+    except ImportError:
+        LOG.warning(
+            "'requests-cache' is not installed, not caching GitHub API calls.")
+        return False
+
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    requests_cache.install_cache(
+        cache_path, backend="sqlite",
+        always_revalidate=True,
+        # NOTE(aznashwan): PyGithub requests some preview media types.
+        match_headers=["Accept"])
+    LOG.debug("Caching GitHub API responses in %s", cache_path)
+    return True
+
+
+def main_with_args(argv: list[str]) -> list[dict]:
+    args = _PARSER.parse_args(argv)
+    # NOTE(aznashwan): only set up logging once the arguments are valid.
+    utils.setupLogging()
+
+    if not args.github_token:
+        args.github_token = os.environ.get("GITHUB_TOKEN")
 
     if not args.github_token:
         raise ValueError(
             f"No GitHub API token provided via '-t/--github-token' argument "
              "or 'GITHUB_TOKEN' environment variable.")
 
-    gh = github.Github(login_or_token=args.github_token)
+    # NOTE(aznashwan): PyGithub (and all of its dependencies) take a while
+    # to import, so we only do so after the arguments were successfully
+    # parsed, keeping '--help' and argument errors snappy.
+    import github
+    from autolabeler import manager
+
+    if args.http_cache:
+        setup_http_cache()
+
+    gh = github.Github(
+        login_or_token=args.github_token,
+        # NOTE(aznashwan): the connection pool must fit all the requests we
+        # issue concurrently, lest connections be discarded and re-established
+        # (with a new TLS handshake) after every request.
+        pool_size=utils.MAX_CONCURRENT_REQUESTS,
+        # NOTE(aznashwan): paginated listings (PR files, comments, reviews,
+        # etc) otherwise default to 30 items per request.
+        per_page=MAX_ITEMS_PER_PAGE)
     # NOTE(aznashwan): transparent login through __getattr__:
     # NOTE^2: login API is completely inaccessible to GitHub action tokens.
     # _ = gh.get_user().login
@@ -113,9 +184,11 @@ def main_with_args(argv: list[str]) -> list[dict]:
                 label_manager.run_post_actions_for_labels(labels)
             else:
                 # NOTE(aznashwan): if not performing an action, remove their refs.
-                for l in labels:
-                    l.post_labelling_action = None
-                    l.post_labelling_comment = None
+                labels = [
+                    dataclasses.replace(
+                        l, post_labelling_action=None,
+                        post_labelling_comment=None)
+                    for l in labels]
         case "purge":
             raise NotImplementedError("no purging yet")
         case other:
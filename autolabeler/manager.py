@@ -12,7 +12,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import logging
+import operator
 
 from github import Github
 from github.Repository import Repository
@@ -20,58 +22,46 @@ from github.Repository import Repository
 from autolabeler import labelers
 from autolabeler.labelers import LabelParams
 from autolabeler import targets
+from autolabeler import utils
 
 
 LOG = logging.getLogger(__name__)
 
+# NOTE(aznashwan): bounded to stay clear of GitHub's secondary rate limits.
+DEFAULT_MAX_WORKERS = utils.MAX_CONCURRENT_REQUESTS
+MAX_CONCURRENT_COMMENTS = 5
+
 
 class LabelsManager():
 
-    def __init__(self, client: Github, target_str: str, labelers_config: dict):
+    def __init__(
+            self, client: Github, target_str: str, labelers_config: dict,
+            max_workers: int=DEFAULT_MAX_WORKERS):
         """ Manages labels on the Github resource with the provided path and config.
 
         Supports inputs of the form:
         - username/repository_name
         - user/repo/{issue/pull}/123 for a specific issue/pull
-            "repo": "<name of the repository>",
-            "type": None/"issue"/"pull",
-            "id": None/int,
-        }
+
+        param max_workers: maximum number of labelers to run concurrently.
         """
         # TODO(aznashwan): handle full URLs.
         # TODO(aznashwan): user/repo/{issues/pulls} for all issues/pulls
         self._client = client
         self._target_str = target_str
         self._labelers_config = labelers_config
+        self._max_workers = max_workers
         self._labelers = labelers.load_labelers_from_config(labelers_config)
 
-        parts = target_str.split('/')
-        if len(parts) not in range(2, 5):
-            raise ValueError(
-                "Target format must be a slash-separated string with the "
-                "following path elements: username/repository[/type[/id]]. "
-                f"Got: {target_str} ({len(parts)} path elements)")
-
-        def _safe_index(n: int):
-            try:
-                return parts[n]
-            except IndexError:
-                return None
-
-        target_id = 0
-        match _safe_index(3):
-            case None:
-                pass
-            case some:
-                target_id = int(some)
-
-        user = parts[0]
-        repo = parts[1]
-        target_type = _safe_index(2)
-        self._labelling_target = targets.RepoLabelsTarget(client, user, repo)
+        target = targets.parse_target_string(target_str)
+        user = target["user"]
+        repo = target["repo"]
+        target_type = target["type"]
+        target_id = target["id"]
         match target_type:
             case None | "":
-                pass
+                self._labelling_target = targets.RepoLabelsTarget(
+                    client, user, repo)
             case 'issue' | 'pull':
                 # NOTE(aznashwan): `ObjectLabellingTarget` can handle both
                 # issues and PRs transparently:
@@ -85,28 +75,91 @@ class LabelsManager():
                 raise ValueError(
                     f"Unsupported target type '{other}'. Must be one of: {accepted}")
 
+        # NOTE(aznashwan): the target's handle never changes, so we fetch it once.
+        self._target_handle = self._labelling_target.get_target_handle()
+
+        # NOTE(aznashwan): memoized results of `generate_labels()` and the
+        # target's `get_labels()` so `sync_labels()` and `remove_undefined()`
+        # do not both query the GitHub API for them.
+        self._generated_labels_cache: list[LabelParams]|None = None
+        self._existing_labels_cache: list[LabelParams]|None = None
+
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}('{self._target_str}')"
 
     def generate_labels(self) -> list[LabelParams]:
         """ Generates labels based on the provided rules for the target. """
-        labels = []
-        for labeler in self._labelers:
-            labels.extend(
-                labeler.get_labels_for_object(
-                    self._labelling_target.get_target_handle()))
-        return labels
+        # NOTE(aznashwan): selector matches are shared between all labelers
+        # for the duration of this call only, so identical selectors defined
+        # under different labels only query the GitHub API once.
+        cache = {}
+        # NOTE(aznashwan): `methodcaller` dispatches to each labeler
+        # without an extra Python-level frame per call.
+        _get_labels = operator.methodcaller(
+            "get_labels_for_object", self._target_handle, cache=cache)
+
+        if self._max_workers <= 1 or len(self._labelers) <= 1:
+            results = [_get_labels(labeler) for labeler in self._labelers]
+        else:
+            # NOTE(aznashwan): labelers spend most of their time waiting on
+            # GitHub API calls, so we run them on the shared API executor.
+            # `map_api_calls()` preserves the order of the labelers.
+            results = utils.map_api_calls(
+                _get_labels, self._labelers,
+                max_concurrency=self._max_workers)
+
+        # NOTE(aznashwan): multiple labelers may emit the same label, which
+        # would lead to redundant API calls when setting them, so only the
+        # first definition of each label name is kept.
+        labels = {}
+        for result in results:
+            for label in result:
+                labels.setdefault(label.name, label)
+        return list(labels.values())
+
+    def _get_generated_labels(self) -> list[LabelParams]:
+        """ Returns the memoized result of `generate_labels()`. """
+        if self._generated_labels_cache is None:
+            self._generated_labels_cache = self.generate_labels()
+        return self._generated_labels_cache
+
+    def _get_existing_labels(self) -> list[LabelParams]:
+        """ Returns the memoized labels currently set on the target. """
+        if self._existing_labels_cache is None:
+            self._existing_labels_cache = self._labelling_target.get_labels()
+        return self._existing_labels_cache
+
+    def _set_labels(self, labels: list[LabelParams]):
+        """ Sets the given labels on the target and updates the memoized
+        existing labels to match without refetching them. """
+        self._labelling_target.set_labels(labels)
+        if self._existing_labels_cache is not None:
+            # NOTE: both targets add/update the labels while keeping others.
+            existing = {l.name: l for l in self._existing_labels_cache}
+            existing.update({l.name: l for l in labels})
+            self._existing_labels_cache = list(existing.values())
+
+    def _remove_labels(self, label_names: list[str]):
+        """ Removes the given labels from the target and updates the
+        memoized existing labels to match without refetching them. """
+        self._labelling_target.remove_labels(label_names)
+        if self._existing_labels_cache is not None:
+            to_remove = set(label_names)
+            self._existing_labels_cache = [
+                l for l in self._existing_labels_cache
+                if l.name not in to_remove]
 
     def sync_labels(self, remove_obsolete=True) -> list[LabelParams]:
         """ Applies all labels to the target, updating them if need be. """
-        new_labels = self.generate_labels()
+        new_labels = self._get_generated_labels()
 
         if remove_obsolete:
-            existing = {l.name: l for l in self._labelling_target.get_labels()}
-            to_add = {l.name for l in new_labels}
-            to_delete = list(set(existing) - to_add)
+            existing_names = frozenset(
+                l.name for l in self._get_existing_labels())
+            to_add = frozenset(l.name for l in new_labels)
+            to_delete = list(existing_names - to_add)
 
-            if to_delete and isinstance(self._labelling_target.get_target_handle(), Repository):
+            if to_delete and isinstance(self._target_handle, Repository):
                 raise NotImplementedError(
                     "Auto-removing obsoltele labels on Repositories as a whole "
                     "requires cross-referencing all PRs/Issues and is thus "
@@ -115,12 +168,12 @@ class LabelsManager():
                     "Alternatively, you could manually define/remove these "
                     f"following undefined/auto-generated labels: {to_delete}")
 
-            self._labelling_target.remove_labels(to_delete)
+            self._remove_labels(to_delete)
             LOG.info(
                 f"Removing following labels from {self._target_str}: {to_delete}")
 
         LOG.info(f"Applying following labels to {self._target_str}: {new_labels}")
-        self._labelling_target.set_labels(new_labels)
+        self._set_labels(new_labels)
         return new_labels
 
     def _add_comments_for_labels(self, labels: list[LabelParams]):
@@ -129,8 +182,16 @@ class LabelsManager():
             for l in labels
             if l.post_labelling_comment}
 
-        for comm in comments:
-            self._labelling_target.add_comment(comm)
+        if len(comments) > 1:
+            # NOTE(aznashwan): each comment is a separate POST, so we
+            # issue them concurrently, albeit with a tighter bound as
+            # rapidly posting content trips GitHub's secondary rate limits.
+            utils.map_api_calls(
+                self._labelling_target.add_comment, comments,
+                max_concurrency=MAX_CONCURRENT_COMMENTS)
+        else:
+            for comm in comments:
+                self._labelling_target.add_comment(comm)
 
         if comments:
             LOG.info(
@@ -138,18 +199,16 @@ class LabelsManager():
                 f"{self._labelling_target}: {comments}")
 
     def run_post_actions_for_labels(self, labels: list[LabelParams]):
-        _ = labels
-
-        actions = {}
+        actions = collections.defaultdict(list)
         for label in labels:
             action = label.post_labelling_action
             if action:
-                actions[action] = actions.get(action, []).append(label)
+                actions[action].append(label)
 
         if len(actions) > 1:
             raise Exception(
                 f"Label definitions dictate multiple conflicting actions "
-                f"on target {self._labelling_target}: {actions}")
+                f"on target {self._labelling_target}: {dict(actions)}")
 
         if not actions:
             LOG.info(
@@ -162,12 +221,13 @@ class LabelsManager():
 
     def remove_undefined(self):
         """ Deletes all labels which are not defined in the config from the target. """
-        existing_labels = self._labelling_target.get_labels()
-        generated_label_names = [l.name for l in self.generate_labels()]
+        existing_labels = self._get_existing_labels()
+        generated_label_names = {l.name for l in self._get_generated_labels()}
         undefined = [
-            l.name for l in existing_labels if l not in generated_label_names]
+            l.name for l in existing_labels
+            if l.name not in generated_label_names]
         if undefined:
             LOG.info(
                 f"Removing following undefined labels from {self._target_str}: "
                 f"{undefined}")
-            self._labelling_target.remove_labels(undefined)
+            self._remove_labels(undefined)
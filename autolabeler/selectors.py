@@ -13,28 +13,67 @@
 #    under the License.
 
 import abc
-from datetime import datetime
+import bisect
+import concurrent.futures
+import contextlib
+from datetime import datetime, timedelta
 import enum
+import functools
 import itertools
 import logging
 import math
 import re
+import threading
+import time
 import types
 import typing
-from typing import Self
+from typing import Callable, Hashable, Iterable, Iterator, Self
+import weakref
+
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
 
 from github.ContentFile import ContentFile
+from github.GitTreeElement import GitTreeElement
 from github.Issue import Issue
 from github.PullRequest import PullRequest
 from github.Repository import Repository
 
+from autolabeler import utils
+
 
 LOG = logging.getLogger(__name__)
 
-MATCH_RESULT_FIELD_REGEX = re.compile(r'^[a-zA-Z_]\w*$')
+# Matches numbered/named backreferences and conditional groups in regexes.
+MULTI_PATTERN_UNSAFE_REGEX = re.compile(r'\\[1-9]|\(\?P=|\(\?\(')
+# Matches anchors, non-boundaries, lookarounds, atomic groups and possessive
+# quantifiers, whose results may differ when a string is searched for as
+# part of a larger concatenated one.
+CONCATENATION_UNSAFE_REGEX = re.compile(
+    r'\^|\$|\\[AZB]|\(\?<?[=!]|\(\?>|[*+?}]\+')
+# Matches syntax which Python's `re` and hyperscan's PCRE-based parser read
+# differently (e.g. PCRE reads 'a{,3}' as a literal, and '\N' as any
+# non-newline), so hyperscan could silently miss matches `re` would find.
+HYPERSCAN_UNSAFE_REGEX = re.compile(r'\{,|\\[uUN]|\[:')
+# Separates strings when concatenating them for searching in a single pass.
+CONCATENATION_SEPARATOR = "\x00"
+# Matches regexes which only search for a literal string, optionally anchored
+# at the start and/or end. (only escaped non-alphanumerics are literals)
+LITERAL_REGEX = re.compile(
+    r'(?P<start>\^?)(?P<literal>(?:[^\\.^$*+?{}\[\]|()]|\\[^A-Za-z0-9])*)'
+    r'(?P<end>\$?)')
 
 FileContainingObject = typing.Union[Repository, PullRequest]
 
+# NOTE(aznashwan): user roles on repos are shared between all selectors, but
+# are only cached for a while so long-running processes observe changes.
+USER_ROLES_CACHE_TTL = 300
+USER_ROLES_CACHE_MAX_SIZE = 1024
+_USER_ROLES_CACHE: dict[tuple[str, str], tuple[float, str]] = {}
+_USER_ROLES_CACHE_LOCK = threading.Lock()
+
 
 class SelectorStrategy(enum.Enum):
     """ Possible strategies for combining selectors. """
@@ -49,7 +88,7 @@ class SelectorStrategy(enum.Enum):
             case SelectorStrategy.ANY:
                 return any
             case SelectorStrategy.NONE:
-                return lambda it: all([not v for v in it])
+                return _none
             case other:
                 raise ValueError(f"No action for seletor strategy {other}")
 
@@ -60,21 +99,54 @@ class ContributionState(enum.Enum):
     CLOSED = "closed"
 
 
+class LazyMatchValue():
+    """ Placeholder for a `MatchResult` value which is only computed
+    the first time it is accessed. """
+
+    __slots__ = ("_compute",)
+
+    def __init__(self, compute: Callable[[], object]):
+        self._compute = compute
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self._compute})"
+
+    def __call__(self) -> object:
+        return self._compute()
+
+
 class MatchResult(dict):
-    """ Simple wrapper around a dict allows dot access on fields. """
-    def __init__(self, d: dict|None=None, reference_key: str|None=None):
-        super().__init__()
+    """ Simple wrapper around a dict allows dot access on fields.
+
+    Nested dicts are only wrapped into `MatchResult`s once accessed, and
+    `LazyMatchValue`s are only computed once accessed.
+    """
+    def __init__(
+            self, d: dict|Iterable[tuple[str, object]]|None=None,
+            reference_key: str|None=None):
+        super().__init__(d or {})
         self._reference_key = reference_key
 
-        if d is None:
-            d = {}
-        for key, value in d.items():
-            key_name = str(key)
-            if not self._check_key_name(key_name):
-                LOG.warning(
-                    f"Unacceptable dict key '{key_name}' for attribute access dict."
-                    " It will require accessing by dictionary key indexing.")
-            self[key_name] = MatchResult(value) if type(value) is dict else value
+        # NOTE(aznashwan): key validation only warns, so optimized
+        # runs ('python -O') skip it entirely, as do copies of results
+        # whose keys were already checked.
+        if isinstance(d, MatchResult):
+            return
+        if __debug__ and LOG.isEnabledFor(logging.WARNING):
+            for key in super().__iter__():
+                if not self._check_key_name(key):
+                    LOG.warning(
+                        f"Unacceptable dict key '{key}' for attribute access dict."
+                        " It will require accessing by dictionary key indexing.")
+
+    @classmethod
+    def for_name_regex(cls, match: dict) -> Self:
+        """ Returns a result with only a 'name_regex' match, referenced by
+        its full value, skipping the key validation of the constructor. """
+        res = cls.__new__(cls)
+        dict.__setitem__(res, "name_regex", match)
+        res._reference_key = "name_regex.full"
+        return res
 
     def get_reference_value(self) -> object|None:
         """ Returns a value from the matches to use to crossref other matches. """
@@ -88,16 +160,182 @@ class MatchResult(dict):
         return curr
 
     def _check_key_name(self, key: str) -> bool:
-        return bool(MATCH_RESULT_FIELD_REGEX.findall(key))
+        return isinstance(key, str) and key.isidentifier()
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        if type(value) is LazyMatchValue:
+            value = value()
+            self[key] = value
+        if type(value) is dict:
+            value = MatchResult(value)
+            self[key] = value
+        return value
 
     def __getattr__(self, key):
         if key in self:
             return self[key]
         raise AttributeError(f"'{key}' is not defined in: {self}")
 
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def _resolve_lazy_values(self):
+        """ Computes all pending `LazyMatchValue`s in place. """
+        for key, value in super().items():
+            if type(value) is LazyMatchValue:
+                # NOTE: replacing existing keys never resizes the dict.
+                super().__setitem__(key, value())
+
+    def items(self):
+        for key in self:
+            self[key]
+        return super().items()
+
+    def values(self):
+        for key in self:
+            self[key]
+        return super().values()
+
+    # NOTE(aznashwan): all other ways of exposing the contents (including
+    # `dict(result)` and `**result`, which go through `keys()`/`__iter__`
+    # for dict subclasses overriding them) must not leak the placeholders.
+    def keys(self):
+        self._resolve_lazy_values()
+        return super().keys()
+
+    def __iter__(self):
+        self._resolve_lazy_values()
+        return super().__iter__()
+
+    def __repr__(self) -> str:
+        self._resolve_lazy_values()
+        return super().__repr__()
+
+    __str__ = __repr__
+
+    def __eq__(self, other) -> bool:
+        self._resolve_lazy_values()
+        if isinstance(other, MatchResult):
+            other._resolve_lazy_values()
+        return super().__eq__(other)
+
+    def __ne__(self, other) -> bool:
+        return not self == other
+
+    __hash__ = None  # pyright: ignore
+
+    def copy(self) -> Self:
+        self._resolve_lazy_values()
+        return self.__class__(self, reference_key=self._reference_key)
+
+
+class ObjectDataCache():
+    """ Memoizes paginated listings (comments, reviews, files) of GitHub
+    objects so that all selectors requiring them only fetch them once.
+
+    Entries are dropped once the object they were fetched for is garbage
+    collected, so listings never outlive the objects they were listed for.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: dict[int, dict[Hashable, concurrent.futures.Future]] = {}
+
+    def _get(self, obj: object, name: Hashable, fetch: Callable):
+        key = id(obj)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                entry = self._data[key] = {}
+                weakref.finalize(obj, self._data.pop, key, None)
+            future = entry.get(name)
+            owner = future is None
+            if owner:
+                # NOTE(aznashwan): selectors may be run concurrently, so
+                # others wait on the result of the first one to fetch it.
+                future = entry[name] = concurrent.futures.Future()
+
+        if owner:
+            try:
+                future.set_result(fetch(obj))
+            except BaseException as ex:
+                future.set_exception(ex)
+                with self._lock:
+                    entry.pop(name, None)
+                raise
+        return future.result()
+
+    def get_issue(self, obj: Issue|PullRequest) -> Issue:
+        """ Returns the Issue view of PRs, or Issues themselves. """
+        if isinstance(obj, Issue):
+            return obj
+        return self._get(obj, "issue", lambda pr: pr.as_issue())
+
+    def get_comments(self, obj: Issue|PullRequest) -> list:
+        # TODO(aznashwan): handle Review Comments too.
+        return self._get(
+            obj, "comments",
+            lambda obj: list(self.get_issue(obj).get_comments()))
+
+    def get_last_comment_timestamp(
+            self, obj: Issue|PullRequest,
+            get_timestamp: Callable[[Issue|PullRequest], datetime]) -> datetime:
+        """ Memoizes the timestamp of the last comment on the given object. """
+        return self._get(obj, "last_comment_timestamp", get_timestamp)
+
+    def get_comment_items(
+            self, obj: Issue|PullRequest, roles: frozenset[str],
+            list_items: Callable[[Issue|PullRequest], list]) -> list[dict]:
+        """ Memoizes the comments to match on the object for the given
+        author roles, so that selectors filtering on them share it. """
+        return self._get(obj, ("comment_items", roles), list_items)
+
+    def get_reviews(self, pr: PullRequest) -> list:
+        return self._get(pr, "reviews", lambda pr: list(pr.get_reviews()))
+
+    def get_file_paths(
+            self, obj: Repository|PullRequest,
+            list_file_paths: Callable[[], dict]) -> dict:
+        """ Memoizes the results of the given `FileLister.list_file_paths`. """
+        return self._get(obj, "file_paths", lambda _: list_file_paths())
+
+    def get_file_diffs(
+            self, pr: PullRequest,
+            list_file_diffs: Callable[[], dict]) -> dict:
+        """ Memoizes the results of the given `FileLister.list_file_diffs`. """
+        return self._get(pr, "file_diffs", lambda _: list_file_diffs())
+
+
+OBJECT_DATA_CACHE = ObjectDataCache()
+
 
 class Selector(metaclass=abc.ABCMeta):
 
+    __slots__ = ()
+
+    # NOTE(aznashwan): rough relative cost of matching, used for ordering
+    # the evaluation of selectors in `MultiSelector`s:
+    # 0 = only checks the object's fields
+    # 1 = requires a single extra API request
+    # 2 = requires paginated API listings (comments/files/reviews)
+    COST_HINT = 1
+
+    # NOTE(aznashwan): set for each subclass at definition time so it can be
+    # passed to `isinstance()` without rebuilding it on every `match()`.
+    _SUPPORTED_TARGET_TYPES: tuple[type, ...] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        try:
+            cls._SUPPORTED_TARGET_TYPES = tuple(
+                cls._get_supported_target_types())
+        except NotImplementedError:
+            # Abstract selector classes define no target types.
+            cls._SUPPORTED_TARGET_TYPES = ()
+
     @abc.abstractclassmethod
     def from_val(cls, val: object|None=None, extra: dict|None=None) -> Self:
         """ Load the selector from a value. """
@@ -119,13 +357,7 @@ class Selector(metaclass=abc.ABCMeta):
         return NotImplemented
 
     def _get_repo_for_object(self, obj: PullRequest|Issue) -> Repository:
-        repo = None
-        if isinstance(obj, Issue):
-            repo = obj.repository
-        else:
-            as_issue = obj.as_issue()
-            repo = as_issue.repository
-        return repo
+        return OBJECT_DATA_CACHE.get_issue(obj).repository
 
 
 class MultiSelector(Selector):
@@ -133,6 +365,23 @@ class MultiSelector(Selector):
     "namespaced" match results with each sub-selector's results.
     """
 
+    __slots__ = (
+        "_selectors", "_selector_strategy", "_strategy_fn",
+        "_failing_result", "_evaluation_order")
+
+    # NOTE(aznashwan): maps the names of the supported selector classes to
+    # them, and is set for each subclass at definition time.
+    _SELECTORS_MAP: dict[str, type] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        try:
+            cls._SELECTORS_MAP = {
+                s.get_selector_name(): s
+                for s in cls._get_selector_classes()}  # pyright: ignore
+        except NotImplementedError:
+            cls._SELECTORS_MAP = {}
+
     def __init__(
             self, selectors: list[Selector],
             selector_strategy: SelectorStrategy=SelectorStrategy.ANY):
@@ -142,6 +391,14 @@ class MultiSelector(Selector):
 
         self._selectors = selectors
         self._selector_strategy = selector_strategy
+        self._strategy_fn = selector_strategy.get_function()
+        # NOTE(aznashwan): cheaper selectors are run first, so that more
+        # expensive ones can be skipped if the strategy fails early.
+        self._evaluation_order = sorted(selectors, key=lambda s: s.COST_HINT)
+        # Whether having matches or not makes the whole strategy fail:
+        self._failing_result = {
+            SelectorStrategy.ALL: False,
+            SelectorStrategy.NONE: True}.get(selector_strategy)
 
     def __repr__(self) -> str:
         selectors = self._selectors
@@ -160,15 +417,14 @@ class MultiSelector(Selector):
         if extra is None:
             extra = {}
 
-        selectors_map = {
-            s.get_selector_name(): s
-            for s in cls._get_selector_classes()}  # pyright: ignore
+        selectors_map = cls._SELECTORS_MAP
 
         # TODO(aznashwan): read this from definition, or the opts?
         strategy = SelectorStrategy(
-            val.pop(
+            val.get(
                 "selector_strategy",
                 extra.get('selector_strategy', SelectorStrategy.ANY.value)))
+        val = {k: v for k, v in val.items() if k != "selector_strategy"}
 
         undefined_selectors = [
             sname for sname in val if sname not in selectors_map]
@@ -187,63 +443,109 @@ class MultiSelector(Selector):
         return cls(selectors, selector_strategy=strategy)
 
     def match(self, obj: object) -> list[MatchResult]:
-        supported_targets = self._get_supported_target_types()
-        if not isinstance(obj, tuple(supported_targets)):
+        match_results = list(self.imatch(obj))
+        LOG.debug("%s.match(%s) = %s", self, obj, match_results)
+        return match_results
+
+    def _run_selectors(self, obj: object) -> dict[str, list[MatchResult]]:
+        """ Returns a dict mapping sub-selector names to their matches.
+
+        Selectors are run cheapest-first, stopping as soon as the strategy
+        fails. Selectors requiring API calls are run concurrently.
+        """
+        selector_matches = {}
+        remote = []
+        for selector in self._evaluation_order:
+            if selector.COST_HINT > 0 and len(self._selectors) > 1:
+                remote.append(selector)
+                continue
+            matches = selector.match(obj)
+            selector_matches[selector.get_selector_name()] = matches
+            if bool(matches) is self._failing_result:
+                return selector_matches
+
+        if not remote:
+            return selector_matches
+
+        # NOTE: closing the iterator cancels the calls which are still pending.
+        results = utils.iter_api_calls(lambda s: s.match(obj), remote)
+        with contextlib.closing(results):
+            for selector, matches in results:
+                selector_matches[selector.get_selector_name()] = matches
+                if bool(matches) is self._failing_result:
+                    break
+        return selector_matches
+
+    def imatch(self, obj: object) -> Iterator[MatchResult]:
+        """ Same as `match()`, but lazily yields the combinations of the
+        sub-selectors' matches instead of building all of them upfront. """
+        supported_targets = self._SUPPORTED_TARGET_TYPES
+        if not isinstance(obj, supported_targets):
             LOG.debug(
-                f"{self}.match({obj}) skipping unsupported target type "
-                f"'{type(obj)}'. Supported types are {supported_targets}.")
-            return []
+                "%s.match(%s) skipping unsupported target type "
+                "'%s'. Supported types are %s.",
+                self, obj, type(obj), supported_targets)
+            return
 
         # TODO(aznashwan): cascade formatting options here?
         # (e.g. conditional regex params and stuff? Seems pretty redundant)
-        selector_matches = {}
-        for selector in self._selectors:
-            selector_name = selector.get_selector_name()
-            selector_matches[selector_name] = selector.match(obj)
-
-        strategy = self._selector_strategy.get_function()
-        if not strategy(selector_matches.values()):
+        selector_matches = self._run_selectors(obj)
+        if not self._strategy_fn(selector_matches.values()):
             LOG.info(
                 f"{self}.match({obj}): multi-selector strategy "
                 f"{self._selector_strategy} failed on selector resuls "
                 f"{selector_matches}. Returning no matches.")
-            return []
+            return
+
+        # Restore the order the selectors were defined in:
+        selector_matches = {
+            s.get_selector_name(): selector_matches[s.get_selector_name()]
+            for s in self._selectors}
 
         all_matches = []
         # maps index in `all_matches` to its selector name to crossref
-        # results from itertools.matches.
-        selector_matches_index_map = {}
+        # results from itertools.product.
+        selector_names = []
         for sname, matches in selector_matches.items():
             # NOTE(aznashwan): defaulting non-matching selectors to empty dict
             # so they can be checked within statements without a nameerror.
             if not matches:
                 LOG.debug(
-                    f"{self}.match({obj}): selector '{sname}' returned no "
-                    "matches. Defaulting to empty dict for compatibility.")
+                    "%s.match(%s): selector '%s' returned no "
+                    "matches. Defaulting to empty dict for compatibility.",
+                    self, obj, sname)
                 selector_matches[sname] = [{}]
                 matches = [{}]
 
-            selector_matches_index_map[len(all_matches)] = sname
+            selector_names.append(sname)
             all_matches.append(matches)
 
-        match_results = []
-        for match_set in itertools.product(*all_matches):
-            match_dict = {
-                selector_matches_index_map[i]: selector_match
-                for i, selector_match in enumerate(match_set)}
-            match_results.append(MatchResult(match_dict))
+        if len(all_matches) == 1:
+            sname = selector_names[0]
+            for selector_match in all_matches[0]:
+                yield MatchResult({sname: selector_match})
+            return
 
-        LOG.debug(f"{self}.match({obj}) = {match_results}")
-        return match_results
+        # NOTE(aznashwan): `itertools.product` already enumerates the
+        # combinations natively, so the only per-row cost left is building
+        # each MatchResult, which we do without an intermediary dict.
+        for match_set in itertools.product(*all_matches):
+            yield MatchResult(zip(selector_names, match_set))
 
 
 class BaseBooleanSelector(Selector):
     """ Abstracts boolean flag-like selectors like "is_merged". """
 
+    __slots__ = ("_desired_result", "_extra")
+
     def __init__(self, desired_result: bool|None=None, extra: dict|None=None):
         self._desired_result = desired_result
         self._extra = extra or {}
 
+    def __repr__(self) -> str:
+        desired_result = self._desired_result
+        return f"{self.__class__.__name__}({desired_result=})"
+
     @abc.abstractmethod
     def _check_criteria(self, obj: object) -> bool:
         raise NotImplementedError("Must implement criteria checking logic.")
@@ -271,7 +573,7 @@ class BaseBooleanSelector(Selector):
             match: <True/False/None>
         }]
         """
-        if not isinstance(obj, tuple(self._get_supported_target_types())):
+        if not isinstance(obj, self._SUPPORTED_TARGET_TYPES):
             return []
 
         check = self._check_criteria(obj)
@@ -291,6 +593,11 @@ class PRMergedSelector(BaseBooleanSelector):
         match: <True/False/None>
     }]
     """
+
+    __slots__ = ()
+
+    COST_HINT = 1
+
     @classmethod
     def get_selector_name(cls):
         return "merged"
@@ -310,6 +617,11 @@ class PRDraftSelector(BaseBooleanSelector):
         match: <True/False/None>
     }]
     """
+
+    __slots__ = ()
+
+    COST_HINT = 0
+
     @classmethod
     def get_selector_name(cls):
         return "draft"
@@ -332,6 +644,11 @@ class PRApprovedSelector(BaseBooleanSelector):
         match: <True/False/None>
     }]
     """
+
+    __slots__ = ()
+
+    COST_HINT = 2
+
     @classmethod
     def get_selector_name(cls):
         return "approved"
@@ -341,19 +658,155 @@ class PRApprovedSelector(BaseBooleanSelector):
         return [PullRequest]
 
     def _check_criteria(self, obj: PullRequest) -> bool:
-        reviews = list(obj.get_reviews())
-        return bool(reviews) and all([r.state == 'APPROVED' for r in reviews])
+        reviews = OBJECT_DATA_CACHE.get_reviews(obj)
+        return bool(reviews) and all(r.state == 'APPROVED' for r in reviews)
+
+
+class MultiPatternMatcher():
+    """ Matches a set of regexes against strings, using a single combined
+    alternation of all of them to cheaply reject strings which none match.
+
+    If 'hyperscan' is installed, all the regexes are instead scanned for in
+    a single pass, and only the ones which hit are re-run to get their groups.
+    """
+
+    def __init__(self, regexes: list[str], case_insensitive: bool=False):
+        self._regexes = regexes
+        # NOTE: selectors often share regexes, so they share the patterns too.
+        self._patterns = {r: _compile(r, case_insensitive) for r in regexes}
+        self._combined = self._compile_combined(
+            self._patterns, case_insensitive)
+        self._concatenation_pattern = self._get_concatenation_pattern()
+        self._hyperscan_db = self._compile_hyperscan(
+            list(self._patterns), case_insensitive)
+        # NOTE: a hyperscan database's scratch space is not thread-safe.
+        self._hyperscan_lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        regexes = self._regexes
+        return f"{self.__class__.__name__}({regexes=})"
+
+    @staticmethod
+    def _compile_combined(
+            patterns: dict[str, re.Pattern],
+            case_insensitive: bool) -> re.Pattern|None:
+        # NOTE(aznashwan): backreferences would point to the wrong groups
+        # once combined, so we conservatively skip the prefilter for them:
+        if len(patterns) < 2 or any(
+                MULTI_PATTERN_UNSAFE_REGEX.search(r) for r in patterns):
+            return None
+        try:
+            return _compile(
+                "|".join(f"(?:{r})" for r in patterns), case_insensitive)
+        except re.error as ex:
+            # e.g. inline global flags or duplicate group names:
+            LOG.debug(
+                "Cannot combine regexes %s for prefiltering: %s",
+                list(patterns), ex)
+            return None
+
+    def _get_concatenation_pattern(self) -> re.Pattern|None:
+        """ Returns a pattern which is certain to match the concatenation
+        of strings if any of the regexes matches any one of them. """
+        if not all(map(_is_concatenation_safe, self._patterns)):
+            return None
+        if len(self._patterns) == 1:
+            return next(iter(self._patterns.values()))
+        return self._combined
+
+    def matches_none(self, values: list[str]) -> bool:
+        """ Returns whether it is certain that none of the regexes match any
+        of the given values, which are searched for in a single pass. """
+        if self._concatenation_pattern is None:
+            return False
+        return not self._concatenation_pattern.search(
+            CONCATENATION_SEPARATOR.join(values))
+
+    @staticmethod
+    def _compile_hyperscan(regexes: list[str], case_insensitive: bool):
+        if hyperscan is None or len(regexes) < 2:
+            return None
+
+        # NOTE(aznashwan): prefilter mode guarantees hyperscan reports a
+        # superset of the real matches (e.g. for backreferences), which
+        # are then always confirmed through `re`. That only holds for the
+        # regexes which both parse the same way though, so any others make
+        # us fall back to matching through `re` alone.
+        unsafe = [r for r in regexes if HYPERSCAN_UNSAFE_REGEX.search(r)]
+        if unsafe:
+            LOG.debug(
+                "Not scanning for regexes %s with hyperscan as it may parse "
+                "%s differently from Python's 're'.", regexes, unsafe)
+            return None
+
+        flags = (
+            hyperscan.HS_FLAG_SINGLEMATCH | hyperscan.HS_FLAG_ALLOWEMPTY |
+            hyperscan.HS_FLAG_PREFILTER | hyperscan.HS_FLAG_UTF8 |
+            hyperscan.HS_FLAG_UCP)
+        if case_insensitive:
+            flags |= hyperscan.HS_FLAG_CASELESS
+        try:
+            db = hyperscan.Database()
+            db.compile(
+                expressions=[r.encode() for r in regexes],
+                ids=list(range(len(regexes))),
+                elements=len(regexes),
+                flags=[flags] * len(regexes))
+        except (hyperscan.error, UnicodeEncodeError) as ex:
+            LOG.debug(
+                "Cannot compile regexes %s with hyperscan: %s", regexes, ex)
+            return None
+        return db
+
+    def _scan_hyperscan(self, value: str) -> set[int]|None:
+        """ Returns the indices of the regexes which hit on the value. """
+        try:
+            data = value.encode()
+        except UnicodeEncodeError:
+            return None
+
+        hits = set()
+        def _on_match(regex_id, start, end, flags, context):
+            hits.add(regex_id)
+        with self._hyperscan_lock:
+            self._hyperscan_db.scan(data, match_event_handler=_on_match)
+        return hits
+
+    def match_groups(self, value: str) -> dict[str, dict|None]:
+        """ Returns a dict mapping each regex to the results of
+        `_get_pattern_match_groups()` for it on the given value. """
+        if self._hyperscan_db is not None:
+            hits = self._scan_hyperscan(value)
+            if hits is not None:
+                return {
+                    r: _get_pattern_match_groups(p, value) if i in hits else None
+                    for i, (r, p) in enumerate(self._patterns.items())}
+
+        if self._combined and not self._combined.search(value):
+            return {r: None for r in self._patterns}
+        return {
+            r: _get_pattern_match_groups(p, value)
+            for r, p in self._patterns.items()}
 
 
 class BaseRegexSelector(Selector):
     """ Returns a match based on a provided regexes. """
 
+    __slots__ = (
+        "_regexes", "_case_insensitive", "_strategy", "_strategy_fn",
+        "_matcher", "_match_key_names")
+
     def __init__(
             self, regexes: list[str], case_insensitive: bool=False,
             strategy: str=SelectorStrategy.ANY.value):
         self._regexes = regexes
         self._strategy = SelectorStrategy(strategy)
+        self._strategy_fn = self._strategy.get_function()
         self._case_insensitive = case_insensitive
+        self._matcher = MultiPatternMatcher(
+            regexes, case_insensitive=case_insensitive)
+        self._match_key_names = [
+            (f"match{i}", f"groups{i}") for i in range(len(regexes))]
 
     @classmethod
     def from_val(cls, val: object|None=None, extra: dict|None=None) -> Self:
@@ -436,56 +889,60 @@ class BaseRegexSelector(Selector):
             LOG.warning(f"{self}.match({obj}): no regexes defined.")
             return []
 
-        supported_types = self._get_supported_target_types()
-        if not supported_types or not isinstance(
-                obj, tuple(self._get_supported_target_types())):
+        supported_types = self._SUPPORTED_TARGET_TYPES
+        if not supported_types or not isinstance(obj, supported_types):
             LOG.warn(
                 f"{self.__class__}.match({obj}) got unsupported object type "
                 f"{type(obj)}. Supported types are {supported_types}")
             return []
 
+        items = self._get_items_to_match(obj)
+        # NOTE(aznashwan): for selectors with many items (e.g. comments),
+        # we first check whether any regex matches any item in one pass.
+        if (self._strategy is not SelectorStrategy.NONE and len(items) > 1
+                and self._matcher.matches_none([i['string'] for i in items])):
+            LOG.debug(
+                "%s.match(%s): no regexes matched any of the %d items.",
+                self, obj, len(items))
+            return []
+
         res = []
-        for item in self._get_items_to_match(obj):
-            matches = {}
+        check = self._strategy_fn
+        # NOTE(aznashwan): identical strings (e.g. bot comments) are only
+        # matched once, so their results must not be updated in place.
+        string_matches = {}
+        for item in items:
             string = item['string']
-            for regex in self._regexes:
-                match = _get_match_groups(
-                    regex, string,
-                    case_insensitive=self._case_insensitive)
-
-                meta = item.get('meta', {})
-                if match and meta:
-                    match.update(meta)
+            matches = string_matches.get(string)
+            if matches is None:
+                matches = self._matcher.match_groups(string)
+                string_matches[string] = matches
 
-                matches[regex] = match
+            meta = item.get('meta', {})
+            if meta:
+                matches = {
+                    r: {**m, **meta} if m else m for r, m in matches.items()}
 
-            check = self._strategy.get_function()
-            if not check([m is not None for m in matches.values()]):
+            if not check(m is not None for m in matches.values()):
                 LOG.debug(
-                    f"{self}.match({obj}): one or more regexes failed to "
-                    f"satisfy strategy '{self._strategy.value}' for '{string}': "
-                    f"{matches}")
+                    "%s.match(%s): one or more regexes failed to "
+                    "satisfy strategy '%s' for '%s': %s",
+                    self, obj, self._strategy.value, string, matches)
                 continue
 
             new = {
                 "strategy": self._strategy.value,
                 "case_insensitive": self._case_insensitive,
-                "full": item}
-            first = {}
-            if matches.get(self._regexes[0]):
-                first = matches[self._regexes[0]]
-            new.update(first)
-
-            for i, r in enumerate(matches):
-                m = matches[r]
-                if not m:
-                    continue
-                new.update({
-                    f"match{i}": m["match"],
-                    f"groups{i}": matches[r]["groups"]})
-            res.append(new)
+                "full": item,
+                **(matches.get(self._regexes[0]) or {})}
+            for (match_key, groups_key), m in zip(
+                    self._match_key_names, matches.values()):
+                if m:
+                    new[match_key] = m["match"]
+                    new[groups_key] = m["groups"]
+            res.append(MatchResult(new))
 
-        return [MatchResult(m) for m in res]
+        return res
 
 
 class TitleRegexSelector(BaseRegexSelector):
@@ -496,6 +953,10 @@ class TitleRegexSelector(BaseRegexSelector):
     }]
     """
 
+    __slots__ = ()
+
+    COST_HINT = 0
+
     @classmethod
     def get_selector_name(cls) -> str:
         return "title"
@@ -507,9 +968,9 @@ class TitleRegexSelector(BaseRegexSelector):
     def _get_items_to_match(self, obj: object) -> list[dict]:
         if not isinstance(obj, PullRequest|Issue):
             LOG.debug(
-                f"{self}._get_items_to_match({obj}): invalid object param. "
+                "%s._get_items_to_match(%s): invalid object param. "
                 "Target object must be of type Issue or PullRequest. "
-                f"Got: {type(obj)}")
+                "Got: %s", self, obj, type(obj))
             return []
 
         return [{
@@ -525,6 +986,10 @@ class ContributionStateRegexSelector(BaseRegexSelector):
     }]
     """
 
+    __slots__ = ()
+
+    COST_HINT = 0
+
     @classmethod
     def get_selector_name(cls) -> str:
         return "state"
@@ -551,6 +1016,10 @@ class AuthorRegexSelector(BaseRegexSelector):
     }]
     """
 
+    __slots__ = ()
+
+    COST_HINT = 0
+
     @classmethod
     def get_selector_name(cls) -> str:
         return "author"
@@ -562,9 +1031,9 @@ class AuthorRegexSelector(BaseRegexSelector):
     def _get_items_to_match(self, obj: object) -> list[dict]:
         if not isinstance(obj, PullRequest|Issue):
             LOG.debug(
-                f"{self}._get_items_to_match({obj}): invalid object param. "
+                "%s._get_items_to_match(%s): invalid object param. "
                 "Target object must be of type Issue or PullRequest. "
-                f"Got: {type(obj)}")
+                "Got: %s", self, obj, type(obj))
             return []
 
         return [{
@@ -580,6 +1049,8 @@ class AuthorRoleRegexSelector(BaseRegexSelector):
     }]
     """
 
+    __slots__ = ()
+
     @classmethod
     def get_selector_name(cls) -> str:
         return "author_role"
@@ -591,14 +1062,14 @@ class AuthorRoleRegexSelector(BaseRegexSelector):
     def _get_items_to_match(self, obj: object) -> list[dict]:
         if not isinstance(obj, PullRequest|Issue):
             LOG.debug(
-                f"{self}._get_items_to_match({obj}): invalid object param. "
+                "%s._get_items_to_match(%s): invalid object param. "
                 "Target object must be of type Issue or PullRequest. "
-                f"Got: {type(obj)}")
+                "Got: %s", self, obj, type(obj))
             return []
 
         repo = self._get_repo_for_object(obj)
         return [{
-            "string": repo.get_collaborator_permission(obj.user.login),
+            "string": _get_user_role(repo, obj.user.login),
         }]
 
 
@@ -612,6 +1083,10 @@ class DescriptionRegexSelector(BaseRegexSelector):
     }]
     """
 
+    __slots__ = ()
+
+    COST_HINT = 0
+
     @classmethod
     def get_selector_name(cls) -> str:
         return "description"
@@ -623,9 +1098,9 @@ class DescriptionRegexSelector(BaseRegexSelector):
     def _get_items_to_match(self, obj: object) -> list[dict]:
         if not isinstance(obj, PullRequest|Issue):
             LOG.debug(
-                f"{self}._get_items_to_match({obj}): invalid object param. "
+                "%s._get_items_to_match(%s): invalid object param. "
                 "Target object must be of type Issue or PullRequest. "
-                f"Got: {type(obj)}")
+                "Got: %s", self, obj, type(obj))
             return []
 
         return [{
@@ -646,14 +1121,16 @@ class BaseCommentsRegexSelector(BaseRegexSelector):
     }]
     """
 
-    __ROLES = []
+    __slots__ = ()
 
-    def __init__(
-            self, regexes: list[str],
-            case_insensitive: bool=False,
-            user_roles_cache: dict|None=None):
+    COST_HINT = 2
+
+    # NOTE(aznashwan): roles the comment authors must have on the repo, or
+    # an empty set to match comments from anyone.
+    _ROLES: frozenset[str] = frozenset()
+
+    def __init__(self, regexes: list[str], case_insensitive: bool=False):
         super().__init__(regexes=regexes, case_insensitive=case_insensitive)
-        self._user_roles_cache = user_roles_cache or {}
 
     @classmethod
     def _get_supported_target_types(cls) -> list[type]:
@@ -688,7 +1165,7 @@ class BaseCommentsRegexSelector(BaseRegexSelector):
     def __repr__(self) -> str:
         regexes = self._regexes
         case_insensitive = self._case_insensitive
-        user_roles = self.__ROLES
+        user_roles = sorted(self._ROLES)
         return (
             f"{self.__class__.__name__}("
             f"{regexes=}, {case_insensitive=}, {user_roles=})")
@@ -696,36 +1173,38 @@ class BaseCommentsRegexSelector(BaseRegexSelector):
     def _get_items_to_match(self, obj: object) -> list[dict]:
         if not isinstance(obj, PullRequest|Issue):
             LOG.debug(
-                f"{self}._get_items_to_match({obj}): invalid object param. "
+                "%s._get_items_to_match(%s): invalid object param. "
                 "Target object must be of type Issue or PullRequest. "
-                f"Got: {type(obj)}")
+                "Got: %s", self, obj, type(obj))
             return []
 
-        repo = None
-        comments = []
-        if isinstance(obj, Issue):
-            repo = obj.repository
-            comments = [c for c in obj.get_comments()]
-        else:
-            # TODO(aznashwan): handle Review Comments too.
-            as_issue = obj.as_issue()
-            repo = as_issue.repository
-            comments = [c for c in as_issue.get_comments()]
+        return OBJECT_DATA_CACHE.get_comment_items(
+            obj, self._ROLES, self._list_comment_items)
+
+    def _list_comment_items(self, obj: Issue|PullRequest) -> list[dict]:
+        comments = OBJECT_DATA_CACHE.get_comments(obj)
+        roles = self._ROLES
+        user_roles = {}
+        if roles:
+            # NOTE(aznashwan): the repo is only needed for checking roles,
+            # which are looked up concurrently for all commenters at once.
+            repo = self._get_repo_for_object(obj)
+            uids = list(dict.fromkeys(comm.user.login for comm in comments))
+            user_roles = dict(utils.iter_api_calls(
+                lambda uid: _get_user_role(repo, uid), uids))
 
         res = []
         for comm in comments:
             role = ""
-            if self.__ROLES:
+            if roles:
                 uid = comm.user.login
-                role = self._user_roles_cache.get(uid)
-                if not role:
-                    role = repo.get_collaborator_permission(uid)
-                    self._user_roles_cache[uid] = role
+                role = user_roles[uid]
 
-                if role not in self.__ROLES:
+                if role not in roles:
                     LOG.debug(
-                        f"Skipping comment {comm.id} as author {uid} with "
-                        f"role {role} is not a {self.__ROLES}")
+                        "Skipping comment %s as author %s with "
+                        "role %s is not a %s",
+                        comm.id, uid, role, roles)
                     continue
 
             res.append({
@@ -742,7 +1221,9 @@ class BaseCommentsRegexSelector(BaseRegexSelector):
 class ContributorCommentsRegexSelector(BaseCommentsRegexSelector):
     """ Matches comments from any contributor on Issues/PRs. """
 
-    __ROLES = []  # pyright: ignore
+    __slots__ = ()
+
+    _ROLES = frozenset()
 
     @classmethod
     def get_selector_name(cls) -> str:
@@ -752,7 +1233,9 @@ class ContributorCommentsRegexSelector(BaseCommentsRegexSelector):
 class MaintainerCommentsRegexSelector(BaseCommentsRegexSelector):
     """ Matches comments from any maintainers on Issues/PRs. """
 
-    __ROLES = ['admin']  # pyright: ignore
+    __slots__ = ()
+
+    _ROLES = frozenset(['admin'])
 
     @classmethod
     def get_selector_name(cls) -> str:
@@ -762,6 +1245,10 @@ class MaintainerCommentsRegexSelector(BaseCommentsRegexSelector):
 class SourceRepoRegexPRSelector(BaseCommentsRegexSelector):
     """ Selects PRs based on regexes of the name of the source repo of the PR. """
 
+    __slots__ = ()
+
+    COST_HINT = 0
+
     @classmethod
     def get_selector_name(cls) -> str:
         return "source_repo"
@@ -773,9 +1260,9 @@ class SourceRepoRegexPRSelector(BaseCommentsRegexSelector):
     def _get_items_to_match(self, obj: object) -> list[dict]:
         if not isinstance(obj, PullRequest):
             LOG.debug(
-                f"{self}._get_items_to_match({obj}): invalid object param. "
+                "%s._get_items_to_match(%s): invalid object param. "
                 "Target object must be of type Issue or PullRequest. "
-                f"Got: {type(obj)}")
+                "Got: %s", self, obj, type(obj))
             return []
 
         return [{
@@ -786,6 +1273,10 @@ class SourceRepoRegexPRSelector(BaseCommentsRegexSelector):
 class SourceBranchRegexPRSelector(BaseCommentsRegexSelector):
     """ Selects PRs based on regexes of the source branch of the PR. """
 
+    __slots__ = ()
+
+    COST_HINT = 0
+
     @classmethod
     def get_selector_name(cls) -> str:
         return "source_branch"
@@ -797,9 +1288,9 @@ class SourceBranchRegexPRSelector(BaseCommentsRegexSelector):
     def _get_items_to_match(self, obj: object) -> list[dict]:
         if not isinstance(obj, PullRequest):
             LOG.debug(
-                f"{self}._get_items_to_match({obj}): invalid object param. "
+                "%s._get_items_to_match(%s): invalid object param. "
                 "Target object must be of type Issue or PullRequest. "
-                f"Got: {type(obj)}")
+                "Got: %s", self, obj, type(obj))
             return []
 
         return [{
@@ -810,6 +1301,10 @@ class SourceBranchRegexPRSelector(BaseCommentsRegexSelector):
 class TargetBranchRegexPRSelector(BaseCommentsRegexSelector):
     """ Selects PRs based on regexes of the target branch of the PR. """
 
+    __slots__ = ()
+
+    COST_HINT = 0
+
     @classmethod
     def get_selector_name(cls) -> str:
         return "target_branch"
@@ -821,9 +1316,9 @@ class TargetBranchRegexPRSelector(BaseCommentsRegexSelector):
     def _get_items_to_match(self, obj: object) -> list[dict]:
         if not isinstance(obj, PullRequest):
             LOG.debug(
-                f"{self}._get_items_to_match({obj}): invalid object param. "
+                "%s._get_items_to_match(%s): invalid object param. "
                 "Target object must be of type Issue or PullRequest. "
-                f"Got: {type(obj)}")
+                "Got: %s", self, obj, type(obj))
             return []
 
         return [{
@@ -838,19 +1333,39 @@ class FileLister():
         self._obj = obj
 
     def _list_files_from_repo(self, repo: Repository, path: str=""):
-        files = []
-        for item in repo.get_contents(path):  # pyright: ignore
-            if item.type == "dir":
-                files.extend(self._list_files_from_repo(repo, item.path))
-            else:
-                files.append(item)
-
-        return files
+        return list_all_files_for_repo(repo, path)
 
     def _list_files_from_pr(self, pr: PullRequest):
-        return list(pr.get_files())
+        # NOTE: the paginated list is streamed page by page.
+        return pr.get_files()
 
     def list_file_paths(self) -> dict:
+        """ Returns a dict mapping file paths to their file objects.
+
+        Results are shared by all `FileLister`s for the same object.
+        """
+        return OBJECT_DATA_CACHE.get_file_paths(
+            self._obj, self._list_file_paths)
+
+    def list_file_diffs(self) -> dict:
+        """ Returns a dict mapping the paths of the files changed in a PR
+        to their line change totals, reusing the `list_file_paths` listing.
+
+        Results are shared by all `FileLister`s for the same object.
+        """
+        return OBJECT_DATA_CACHE.get_file_diffs(
+            self._obj, self._list_file_diffs)
+
+    def _list_file_diffs(self) -> dict:
+        return {
+            filepath: {
+                "total": file.additions + file.deletions,
+                "additions": file.additions,
+                "deletions": file.deletions,
+                "net": file.additions - file.deletions}
+            for filepath, file in self.list_file_paths().items()}
+
+    def _list_file_paths(self) -> dict:
         if isinstance(self._obj, Repository):
             return {
                 f.path: f for f in self._list_files_from_repo(self._obj, "")}
@@ -864,18 +1379,46 @@ class FileLister():
 class FilesSelector(Selector):
     """ Selects Repos/PRs based on contained file properties. """
 
+    __slots__ = (
+        "_file_type", "_file_re_case_insensitive", "_file_name_pattern",
+        "_file_name_re", "_file_name_concatenable", "_file_name_literal")
+
+    COST_HINT = 2
+
+    _SUPPORTED_KEYS = frozenset(["name_regex", "type"])
+
     def __init__(
-            self, file_name_re: str="", file_type: str="",
+            self, file_name_re: str|re.Pattern="", file_type: str="",
             name_re_case_insensitive: bool=False):
+        if file_type:
+            raise NotImplementedError(
+                "Filetype selection not yet implemented.")
         self._file_type = file_type
-        self._file_name_re = file_name_re
         self._file_re_case_insensitive = name_re_case_insensitive
+        # NOTE(aznashwan): the name regex is compiled once here so that
+        # `match()` does not need to look it up for every file path.
+        self._file_name_pattern = None
+        if isinstance(file_name_re, re.Pattern):
+            self._file_name_pattern = file_name_re
+            file_name_re = file_name_re.pattern
+        elif file_name_re:
+            self._file_name_pattern = _compile(
+                file_name_re, name_re_case_insensitive)
+        self._file_name_re = file_name_re
+        self._file_name_concatenable = _is_concatenation_safe(file_name_re)
+        # NOTE(aznashwan): plain strings like 'docs/' or '\.py$' are far
+        # cheaper to check for with string methods than with a regex.
+        self._file_name_literal = None
+        if self._file_name_pattern and not self._file_name_pattern.flags & (
+                re.IGNORECASE | re.MULTILINE):
+            self._file_name_literal = _get_literal_checker(file_name_re)
 
     def __repr__(self) -> str:
         cls = self.__class__.__name__
+        file_type = self._file_type
         name_regex = self._file_name_re
         name_re_case_insensitive = self._file_re_case_insensitive
-        return f"{cls}({name_regex=}, {name_re_case_insensitive=})"
+        return f"{cls}({file_type=}, {name_regex=}, {name_re_case_insensitive=})"
 
     @classmethod
     def get_selector_name(cls):
@@ -892,11 +1435,11 @@ class FilesSelector(Selector):
                 f"{cls.__name__}.from_val() requires dict, got: {val}")
         if not extra:
             extra = {}
-        supported_keys = ["name_regex", "type"]
-        if not any(k in val for k in supported_keys):
+        supported_keys = cls._SUPPORTED_KEYS
+        if supported_keys.isdisjoint(val):
             raise ValueError(
                 f"FilesSelector requires at least one options key "
-                f"({supported_keys}). Got {val}")
+                f"({sorted(supported_keys)}). Got {val}")
 
         kwargs = {
             "file_name_re": val.get("name_regex", ""),
@@ -926,50 +1469,66 @@ class FilesSelector(Selector):
                 f"{self.__class__}.match() got unsupported object type {type(obj)}: {obj}")
             return []
 
+        if not self._file_name_pattern:
+            return []
         lister = FileLister(obj)
-        all_files = lister.list_file_paths()
+        all_files = list(lister.list_file_paths())
+
+        if self._file_name_literal:
+            literal, check = self._file_name_literal
+            return [
+                MatchResult.for_name_regex(
+                    {"full": path, "match": literal, "groups": []})
+                for path in all_files if check(path)]
+
+        # NOTE(aznashwan): rather than searching every path one by one, the
+        # concatenated paths are searched to skip over non-matching ones.
+        pattern = self._file_name_pattern
+        candidates = range(len(all_files))
+        if self._file_name_concatenable:
+            candidates = _iter_concatenated_candidates(pattern, all_files)
 
         res = []
-        for path in all_files:
-            new = {}
-            ref = None
-            if self._file_name_re:
-                match = _get_match_groups(
-                    self._file_name_re, path,
-                    case_insensitive=self._file_re_case_insensitive)
-                if match:
-                    new["name_regex"] = match
-                    ref = "name_regex.full"
-            if self._file_type:
-                raise NotImplementedError(
-                    "Filetype selection not yet implemented.")
-            if new:
-                res.append(MatchResult(new, reference_key=ref))
+        for i in candidates:
+            match = _get_pattern_match_groups(pattern, all_files[i])
+            if match:
+                res.append(MatchResult.for_name_regex(match))
 
         return res
 
 
 class DiffSelector(Selector):
 
+    __slots__ = ("_min", "_max", "_change_type", "_count_changes")
+
+    COST_HINT = 2
+
+    _SUPPORTED_KEYS = frozenset(["min", "max", "type"])
+
+    _CHANGE_COUNTERS = {
+        "additions": lambda additions, deletions: additions,
+        "deletions": lambda additions, deletions: deletions,
+        "total": lambda additions, deletions: additions + deletions,
+        "net": lambda additions, deletions: additions - deletions}
+
     def __init__(
             self, min: float|None=None, max: float|None=None,
             change_type: str="total"):
         if min is None and max is None:
             raise ValueError(
                 f"{self.__class__}: at least one of min/max is required.")
-        if not min:
+        if min is None:
             min = -math.inf
         self._min = min
-        if not max:
+        if max is None:
             max = math.inf
         self._max = max
-        supported_change_types = [
-            "additions", "deletions", "total", "net"]
-        if change_type not in supported_change_types:
+        if change_type not in self._CHANGE_COUNTERS:
             raise ValueError(
                 f"Unsupported change type {change_type}. "
-                f"Must be one of: {supported_change_types}")
+                f"Must be one of: {list(self._CHANGE_COUNTERS)}")
         self._change_type = change_type
+        self._count_changes = self._CHANGE_COUNTERS[change_type]
 
     def __repr__(self) -> str:
         cls = self.__class__.__name__
@@ -993,8 +1552,7 @@ class DiffSelector(Selector):
             raise NotImplementedError(
                 f"{cls.__name__}.from_val() requires dict, got: {val}")
 
-        supported_keys = ["min",  "max", "type"]
-        unsupported_keys = [k for k in val if k not in supported_keys]
+        unsupported_keys = [k for k in val if k not in cls._SUPPORTED_KEYS]
         if unsupported_keys:
             raise ValueError(
                 f"{cls}.from_val() got unsupported keys: {unsupported_keys}")
@@ -1035,49 +1593,44 @@ class DiffSelector(Selector):
         if isinstance(obj, Repository):
             return [MatchResult(res)]
 
-        changes = 0
-        match self._change_type:
-            case "total":
-                changes = obj.additions + obj.deletions
-            case "additions":
-                changes = obj.additions
-            case "deletions":
-                changes = obj.deletions
-            case "net":
-                changes = obj.additions - obj.deletions
-            case other:
-                raise ValueError(
-                    f"Got unsupported change totalling scheme: {other}")
+        # NOTE(aznashwan): the attributes are only read once as PyGithub
+        # may lazily complete the object when first accessing them.
+        additions, deletions = obj.additions, obj.deletions
+        changes = self._count_changes(additions, deletions)
 
-        if self._min is not None and changes < self._min:
-            return []
-        if self._max is not None and changes >= self._max:
+        if changes < self._min or changes >= self._max:
             return []
 
         res.update({
-            "total": obj.additions + obj.deletions,
-            "additions": obj.additions,
-            "deletions": obj.deletions,
-            "net": obj.additions - obj.deletions})
+            "total": additions + deletions,
+            "additions": additions,
+            "deletions": deletions,
+            "net": additions - deletions})
 
-        files = {}
-        lister = FileLister(obj)
-        for filepath, file in lister.list_file_paths().items():
-            files[filepath] = {
-                "total": file.additions + file.deletions,
-                "additions": file.additions,
-                "deletions": file.deletions,
-                "net": file.additions - file.deletions}
-        res["files"] = files  # pyright: ignore
+        # NOTE(aznashwan): the per-file breakdown requires listing all the
+        # files of the PR, so it is only done if actually referenced.
+        res["files"] = LazyMatchValue(  # pyright: ignore
+            FileLister(obj).list_file_diffs)
 
         return [MatchResult(res)]
 
 
-class BaseLastActivitySelector(metaclass=abc.ABCMeta):
+class BaseLastActivitySelector():
     """ Selects issues/PRs based on the duration in days since last update. """
 
+    __slots__ = ("_days_since", "_threshold")
+
+    COST_HINT = 0
+
     def __init__(self, days_since: int=0):
         self._days_since = days_since
+        # NOTE: equivalent to comparing against `delta.days`, as the
+        # threshold is always a whole number of days.
+        self._threshold = timedelta(days=days_since)
+
+    def __repr__(self) -> str:
+        days_since = self._days_since
+        return f"{self.__class__.__name__}({days_since=})"
 
     @classmethod
     def from_val(cls, val: object|None=None, extra: dict|None=None) -> Self:
@@ -1089,7 +1642,6 @@ class BaseLastActivitySelector(metaclass=abc.ABCMeta):
 
         return cls(days_since=val or 0)
 
-    @abc.abstractmethod
     def _get_last_update_timestamp(self, obj: Issue|PullRequest):
         _ = obj
         raise NotImplementedError("Must implement last timestamp.")
@@ -1103,15 +1655,16 @@ class BaseLastActivitySelector(metaclass=abc.ABCMeta):
         """
         if not isinstance(obj, (Issue, PullRequest)):
             LOG.debug(
-                f"{self}.match({obj}) skipping unsupported target type "
-                f"'{type(obj)}'. Supported types are Issues and PRs.")
+                "%s.match(%s) skipping unsupported target type "
+                "'%s'. Supported types are Issues and PRs.",
+                self, obj, type(obj))
             return []
 
         now = datetime.now()
         last_update = self._get_last_update_timestamp(obj)
 
         delta = now - last_update
-        if self._days_since and delta.days < self._days_since:
+        if self._days_since and delta < self._threshold:
             return []
 
         return [MatchResult({
@@ -1123,6 +1676,8 @@ class BaseLastActivitySelector(metaclass=abc.ABCMeta):
 
 class LastContributionActivitySelector(BaseLastActivitySelector):
 
+    __slots__ = ()
+
     @classmethod
     def get_selector_name(cls) -> str:
         return "last_activity"
@@ -1133,30 +1688,29 @@ class LastContributionActivitySelector(BaseLastActivitySelector):
 
 class LastContributionCommentSelector(BaseLastActivitySelector):
 
+    __slots__ = ()
+
+    COST_HINT = 2
+
     @classmethod
     def get_selector_name(cls) -> str:
         return "last_comment"
 
     def _get_last_update_timestamp(self, obj: Issue|PullRequest):
+        return OBJECT_DATA_CACHE.get_last_comment_timestamp(
+            obj, self._get_last_comment_timestamp)
 
-        comments = []
-        if isinstance(obj, Issue):
-            comments = [c for c in obj.get_comments()]
-        else:
-            # TODO(aznashwan): handle Review Comments too.
-            as_issue = obj.as_issue()
-            comments = [c for c in as_issue.get_comments()]
-
-        last_update = obj.created_at
-        for comm in comments:
-            last_comm_update = comm.updated_at or comm.created_at
-            if last_comm_update > last_update:
-                last_update = last_comm_update
-
-        return last_update
+    @staticmethod
+    def _get_last_comment_timestamp(obj: Issue|PullRequest):
+        comments = OBJECT_DATA_CACHE.get_comments(obj)
+        return max(
+            (c.updated_at or c.created_at for c in comments),
+            default=obj.created_at)
 
 
 class RepoSelector(MultiSelector):
+    __slots__ = ()
+
     @classmethod
     def get_selector_name(cls) -> str:
         return "repo"
@@ -1171,6 +1725,8 @@ class RepoSelector(MultiSelector):
 
 
 class PRsSelector(MultiSelector):
+    __slots__ = ()
+
     # def __init__(self,
     #              author: str|None=None,
     #              author_roles: str|None=None,
@@ -1208,6 +1764,8 @@ class PRsSelector(MultiSelector):
 
 class IssuesSelector(MultiSelector):
 
+    __slots__ = ()
+
     @classmethod
     def get_selector_name(cls) -> str:
         return "issue"
@@ -1252,13 +1810,23 @@ SELECTOR_CLASSES = [
 ]
 
 
-def get_selector_cls(selector_name: str, raise_if_missing: bool=True) -> typing.Type:
+def _build_selector_name_map() -> dict[str, typing.Type]:
     selector_name_map = {s.get_selector_name(): s for s in SELECTOR_CLASSES}
     if len(selector_name_map) != len(SELECTOR_CLASSES):
-        selector_names = [(cls, cls.s.get_selector_name()) for cls in SELECTOR_CLASSES]
+        selector_names = [
+            (cls, cls.get_selector_name()) for cls in SELECTOR_CLASSES]
         raise ValueError(
             f"Multiple selectors share the same name: {selector_names}")
+    return selector_name_map
+
+
+# NOTE(aznashwan): built once at import time so that duplicate selector
+# names are caught early and lookups are a single dict access.
+_SELECTOR_NAME_MAP = _build_selector_name_map()
 
+
+def get_selector_cls(selector_name: str, raise_if_missing: bool=True) -> typing.Type:
+    selector_name_map = _SELECTOR_NAME_MAP
     selector = selector_name_map.get(selector_name)
     if not selector:
         msg = (
@@ -1273,18 +1841,51 @@ def get_selector_cls(selector_name: str, raise_if_missing: bool=True) -> typing.
 
 
 def list_files_for_repo(obj: Repository, path: str="") -> list[ContentFile]:
-    return list(obj.get_contents(path))  # pyright: ignore
+    # NOTE: listing a directory already returns a list of its contents.
+    return obj.get_contents(path)  # pyright: ignore
 
 
-def list_all_files_for_repo(obj: Repository, path="") -> list[ContentFile]:
-    files = []
-    for item in list_files_for_repo(obj, path=path):
-        if item.type == "dir":
-            files.extend(list_all_files_for_repo(obj, path=item.path))
-        else:
-            files.append(item)
+def list_all_files_for_repo(
+        obj: Repository, path="") -> Iterator[ContentFile|GitTreeElement]:
+    """ Recursively lists all files under the given path of the repo,
+    yielding them so callers need not hold an intermediate list. """
+    # NOTE(aznashwan): the git tree API lists the whole tree in a
+    # single request, as opposed to one request per directory.
+    if not path:
+        tree = obj.get_git_tree(obj.default_branch, recursive=True)
+        if not tree.truncated:
+            yield from (item for item in tree.tree if item.type != "tree")
+            return
+        LOG.debug(
+            "Git tree of %s is truncated, listing its contents instead.", obj)
+
+    yield from _walk_files_for_repo(obj, path)
+
+
+def _walk_files_for_repo(obj: Repository, path="") -> Iterator[ContentFile]:
+    """ Lists all files under the given path through the contents API.
 
-    return files
+    The directories on each level of the tree are listed concurrently,
+    with the files being returned in the same depth-first order as
+    when listing them one directory at a time.
+    """
+    listings = {path: list_files_for_repo(obj, path=path)}
+    pending = [i.path for i in listings[path] if i.type == "dir"]
+    while pending:
+        listings.update(zip(pending, utils.map_api_calls(
+            lambda p: list_files_for_repo(obj, path=p), pending)))
+        pending = [
+            i.path for p in pending for i in listings[p] if i.type == "dir"]
+
+    stack = [iter(listings.pop(path))]
+    while stack:
+        item = next(stack[-1], None)
+        if item is None:
+            stack.pop()
+        elif item.type == "dir":
+            stack.append(iter(listings.pop(item.path)))
+        else:
+            yield item
 
 
 def _get_match_groups(
@@ -1295,11 +1896,21 @@ def _get_match_groups(
         groups: ["list", "of", "match", "groups"],
     }
     """
-    flags = []
+    return _get_pattern_match_groups(_compile(regex, case_insensitive), value)
+
+
+@functools.lru_cache(maxsize=512)
+def _compile(regex: str, case_insensitive: bool=False) -> re.Pattern:
+    """ Compiles the given regex once and reuses it on subsequent calls. """
+    flags = 0
     if case_insensitive:
-        flags = [re.IGNORECASE]
+        flags = re.IGNORECASE
+    return re.compile(regex, flags)
+
 
-    match = re.search(regex, value[0:], *flags)
+def _get_pattern_match_groups(pattern: re.Pattern, value: str) -> dict|None:
+    """ Same as `_get_match_groups()` for an already-compiled pattern. """
+    match = pattern.search(value)
     if not match:
         return None
 
@@ -1309,5 +1920,86 @@ def _get_match_groups(
         "groups": list(match.groups()),
     }
 
-    LOG.debug(f"Match result for {regex=} to {value=}: {res}")
+    regex = pattern.pattern
+    LOG.debug("Match result for regex=%r to value=%r: %s", regex, value, res)
     return res
+
+
+def _is_concatenation_safe(regex: str) -> bool:
+    """ Returns whether the regex is sure to match the concatenation of
+    strings whenever it matches any one of them. """
+    # NOTE: negated character classes are the only safe use of '^'.
+    return not CONCATENATION_UNSAFE_REGEX.search(regex.replace("[^", "["))
+
+
+def _get_literal_checker(
+        regex: str) -> tuple[str, Callable[[str], bool]]|None:
+    """ If the regex only searches for a literal string, returns the string
+    and a function checking whether the regex would match a given value. """
+    parsed = LITERAL_REGEX.fullmatch(regex)
+    if not parsed:
+        return None
+
+    literal = re.sub(
+        r'\\(.)', r'\1', parsed.group("literal"), flags=re.DOTALL)
+    # NOTE: '$' also matches right before a trailing newline.
+    match bool(parsed.group("start")), bool(parsed.group("end")):
+        case True, True:
+            check = lambda v: v == literal or v == literal + "\n"
+        case True, False:
+            check = lambda v: v.startswith(literal)
+        case False, True:
+            check = lambda v: (
+                v.endswith(literal) or v.endswith(literal + "\n"))
+        case _:
+            check = lambda v: literal in v
+    return literal, check
+
+
+def _iter_concatenated_candidates(
+        pattern: re.Pattern, values: list[str]) -> Iterator[int]:
+    """ Yields the indices of the values which the concatenation-safe
+    pattern may match, skipping all values in-between in a single search.
+    """
+    if not values:
+        return
+
+    blob = CONCATENATION_SEPARATOR.join(values)
+    starts = list(itertools.accumulate(
+        (len(v) + len(CONCATENATION_SEPARATOR) for v in values[:-1]),
+        initial=0))
+    pos = 0
+    while match := pattern.search(blob, pos):
+        # NOTE: the match may span several values, so it only tells us
+        # the value it starts in is the first which may match on its own.
+        index = bisect.bisect_right(starts, match.start()) - 1
+        yield index
+        if index + 1 == len(values):
+            return
+        pos = starts[index + 1]
+
+
+def _get_user_role(repo: Repository, login: str) -> str:
+    """ Returns the permission of the given user on the repo, caching it
+    for `USER_ROLES_CACHE_TTL` seconds across all selectors, for at most
+    `USER_ROLES_CACHE_MAX_SIZE` users/repos. """
+    key = (repo.full_name, login)
+    now = time.monotonic()
+    cached = _USER_ROLES_CACHE.get(key)
+    if cached and now - cached[0] < USER_ROLES_CACHE_TTL:
+        return cached[1]
+
+    role = repo.get_collaborator_permission(login)
+    # NOTE: lookups run concurrently, so the eviction is guarded. Entries
+    # are re-inserted when refreshed, so the first one is always the oldest.
+    with _USER_ROLES_CACHE_LOCK:
+        _USER_ROLES_CACHE.pop(key, None)
+        if len(_USER_ROLES_CACHE) >= USER_ROLES_CACHE_MAX_SIZE:
+            _USER_ROLES_CACHE.pop(next(iter(_USER_ROLES_CACHE)), None)
+        _USER_ROLES_CACHE[key] = (now, role)
+    return role
+
+
+def _none(iterable) -> bool:
+    """ Returns True if no element of the iterable is truthy. """
+    return not any(iterable)
@@ -14,8 +14,10 @@
 
 import abc
 import logging
+import re
 
 from github import Github
+from github import GithubException
 from github.Issue import Issue
 from github.Label import Label
 from github.PullRequest import PullRequest
@@ -23,10 +25,52 @@ from github.Repository import Repository
 
 from autolabeler.actions import PostLabellingAction
 from autolabeler.labelers import LabelParams
+from autolabeler import utils
 
 
 LOG = logging.getLogger(__name__)
 
+# NOTE(aznashwan): target types are validated by the `LabelsManager`.
+TARGET_STRING_REGEX = re.compile(
+    r"(?P<user>[^/]+)/(?P<repo>[^/]+)(?:/(?P<type>[^/]*)(?:/(?P<id>\d+))?)?")
+
+# NOTE(aznashwan): the REST API lists at most 30 labels per page by default,
+# while GraphQL can return up to 100 per request.
+REPO_LABELS_GRAPHQL_QUERY = """
+query($owner: String!, $name: String!, $cursor: String) {
+  repository(owner: $owner, name: $name) {
+    labels(first: 100, after: $cursor) {
+      nodes { name color description }
+      pageInfo { hasNextPage endCursor }
+    }
+  }
+}
+"""
+
+
+def parse_target_string(target_str: str) -> dict:
+    """ Parses target strings of the form 'username/repository[/type[/id]]'
+    into a dict of the form: {
+        "user": "<name of the user/org owning the repository>",
+        "repo": "<name of the repository>",
+        "type": None/"issue"/"pull",
+        "id": 0/int,
+    }
+    """
+    match = TARGET_STRING_REGEX.fullmatch(target_str)
+    if not match:
+        raise ValueError(
+            "Target format must be a slash-separated string with the "
+            "following path elements: username/repository[/type[/id]]. "
+            f"Got: {target_str}")
+
+    target_id = match["id"]
+    return {
+        "user": match["user"],
+        "repo": match["repo"],
+        "type": match["type"],
+        "id": int(target_id) if target_id else 0}
+
 
 class BaseLabelsTarget(metaclass=abc.ABCMeta):
     """ ABC for GitHub API entities which can have labels applies to them. """
@@ -82,7 +126,29 @@ class RepoLabelsTarget(BaseLabelsTarget):
         return self._repo
 
     def get_labels(self) -> list[LabelParams]:
-        return [LabelParams.from_label(l) for l in self._repo.get_labels()]
+        """ Lists all labels on the repo through the GraphQL API, which
+        requires a single request for repos with up to 100 labels. """
+        labels = []
+        variables = {"owner": self._user, "name": self._name, "cursor": None}
+        while True:
+            try:
+                _, response = self._client.requester.graphql_query(
+                    REPO_LABELS_GRAPHQL_QUERY, variables)
+            except GithubException as ex:
+                # NOTE: PyGithub raises for any GraphQL errors in responses,
+                # including for missing repos.
+                raise Exception(
+                    f"{self}: failed to list repo labels through "
+                    f"GraphQL: {ex}") from ex
+            page = response["data"]["repository"]["labels"]
+            # NOTE: mirrors `LabelParams.from_label()` for missing descriptions.
+            labels.extend(
+                LabelParams(n["name"], n["color"], str(n["description"]))
+                for n in page["nodes"])
+
+            if not page["pageInfo"]["hasNextPage"]:
+                return labels
+            variables["cursor"] = page["pageInfo"]["endCursor"]
 
     def perform_action(self, action: PostLabellingAction) -> bool:
         raise Exception(f"{self}: Cannot perform '{action}' on Repository.")
@@ -101,17 +167,28 @@ class RepoLabelsTarget(BaseLabelsTarget):
         LOG.info(
             f"Updating following labels on repo {self._user}/{self._name}: "
             f"{labels_to_update}")
-        for l in labels_to_update:
-            elabel = existing_labels_map[l.name]
-            elabel.edit(l.name, l.color, l.description)
+
+        def _update(label: LabelParams):
+            elabel = existing_labels_map[label.name]
+            elabel.edit(label.name, label.color, label.description)
             elabel.update()
             LOG.debug(
-                f"Updated repo {self._user}/{self._name} label {elabel} to: {l}")
+                "Updated repo %s/%s label %s to: %s",
+                self._user, self._name, elabel, label)
+
+        def _create(label: LabelParams):
+            self._repo.create_label(label.name, label.color, label.description)
 
         labels_to_create = [
             l for l in labels if l.name not in existing_labels_map]
-        for l in labels_to_create:
-            self._repo.create_label(l.name, l.color, l.description)
+        calls = [(_update, l) for l in labels_to_update] + [
+            (_create, l) for l in labels_to_create]
+        if not calls:
+            return
+
+        # NOTE(aznashwan): there is no bulk endpoint for creating/updating
+        # repo labels, so we at least issue the requests concurrently.
+        utils.map_api_calls(lambda call: call[0](call[1]), calls)
 
     def remove_labels(self, labels: list[str]):
         """ Removes labels with the selected name. """
@@ -131,9 +208,17 @@ class RepoLabelsTarget(BaseLabelsTarget):
         LOG.info(
             f"Deleting following labels on repo {self._user}/{self._name}: "
             f"{to_delete}")
-        for name in to_delete:
+        if not to_delete:
+            return
+
+        def _delete(name: str):
             existing_labels_map[name].delete()
-            LOG.debug(f"Deleted repo {self._user}/{self._name} label '{name}'")
+            LOG.debug(
+                "Deleted repo %s/%s label '%s'", self._user, self._name, name)
+
+        # NOTE(aznashwan): the REST API can only delete repo labels one by
+        # one, so we at least issue the requests concurrently.
+        utils.map_api_calls(_delete, to_delete)
 
 
 
@@ -258,22 +343,34 @@ class ObjectLabellingTarget(BaseLabelsTarget):
 
         # NOTE(aznashwan): `set_labels()` overwrites the whole label list,
         # so we must union the label sets ourselves.
-        old_labels = self.get_labels()
-        label_names_to_add = {l.name for l in old_labels}.union(
-            {l.name for l in labels})
-
-        if label_names_to_add:
-            LOG.info(f"Adding following labels to "
-                     f"{self._get_target_resource_path()}: {label_names_to_add}")
-            labels_to_add = [
-                label_objects_map[l]
-                for l in label_names_to_add]
-            self._target_obj.set_labels(*labels_to_add)
+        old_label_names = frozenset(l.name for l in self.get_labels())
+        label_names_to_add = old_label_names.union(l.name for l in labels)
+        if label_names_to_add == old_label_names:
+            LOG.debug(
+                "All labels already set on %s: %s",
+                self._get_target_resource_path(), old_label_names)
+            return
+
+        LOG.info(f"Adding following labels to "
+                 f"{self._get_target_resource_path()}: {label_names_to_add}")
+        labels_to_add = [
+            label_objects_map[l]
+            for l in label_names_to_add]
+        self._target_obj.set_labels(*labels_to_add)
 
     def remove_labels(self, labels: list[str]):
-        existing_labels_map = {l.name: l for l in self._target_obj.get_labels()}
-        for label in labels:
-            label_obj = existing_labels_map.get(label)
-            if label_obj:
-                label_obj.delete()
-                LOG.info(f"Deleted label: {label_obj}")
+        """ Removes the labels with the given names from the target. """
+        to_remove = set(labels)
+        existing_names = [l.name for l in self._target_obj.get_labels()]
+        removed = [name for name in existing_names if name in to_remove]
+        if not removed:
+            return
+
+        # NOTE(aznashwan): replacing the whole label set takes a single request
+        # regardless of how many labels are being removed. Deleting the Label
+        # objects themselves would remove them from the repo as a whole.
+        remaining = [name for name in existing_names if name not in to_remove]
+        self._target_obj.set_labels(*remaining)
+        LOG.info(
+            f"Removed following labels from "
+            f"{self._get_target_resource_path()}: {removed}")
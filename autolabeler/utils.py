@@ -12,12 +12,28 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import concurrent.futures
+import itertools
 import logging
 import re
+import threading
+from typing import Callable, Iterable, Iterator, TypeVar
 
 
 LOG = logging.getLogger(__name__)
 
+T = TypeVar("T")
+R = TypeVar("R")
+
+# NOTE(aznashwan): bounded to stay clear of GitHub's secondary rate limits.
+# All API-bound work shares a single executor of this size, so this is also
+# the upper bound of requests in flight at any time.
+MAX_CONCURRENT_REQUESTS = 10
+
+_API_EXECUTOR: concurrent.futures.ThreadPoolExecutor|None = None
+_API_EXECUTOR_LOCK = threading.Lock()
+_API_WORKER_STATE = threading.local()
+
 RGB_COLOR_REGEX = re.compile("[a-fA-F0-9]{6}")
 
 LABEL_COLOR_CODES = {
@@ -60,6 +76,10 @@ class ColorFormatter(logging.Formatter):
 
 def setupLogging(level=logging.DEBUG):
     logger = logging.getLogger()
+    # NOTE(aznashwan): repeated calls (e.g. programmatic invocations of
+    # `main_with_args()`) would otherwise duplicate every log line.
+    if logger.handlers:
+        return logger
     logger.setLevel(level)
 
     # create console handler and set level to debug
@@ -114,3 +134,69 @@ def merge_dicts(dict1: dict, dict2: dict) -> dict:
         res[key] = v2
 
     return res
+
+
+def _mark_api_worker():
+    _API_WORKER_STATE.is_worker = True
+
+
+def _get_api_executor() -> concurrent.futures.ThreadPoolExecutor:
+    global _API_EXECUTOR
+    with _API_EXECUTOR_LOCK:
+        if _API_EXECUTOR is None:
+            _API_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+                max_workers=MAX_CONCURRENT_REQUESTS,
+                thread_name_prefix="autolabeler-api",
+                initializer=_mark_api_worker)
+        return _API_EXECUTOR
+
+
+def iter_api_calls(
+        func: Callable[[T], R], items: Iterable[T],
+        max_concurrency: int=MAX_CONCURRENT_REQUESTS) -> Iterator[tuple[T, R]]:
+    """ Calls `func` on all items through the shared API executor, yielding
+    `(item, result)` pairs in the order in which the calls complete.
+
+    Calls made from within one of the executor's workers are run inline,
+    as nesting pools would multiply the number of requests in flight (and
+    could deadlock the shared executor waiting on itself). Calls which are
+    still pending when the iterator is closed early are cancelled.
+    """
+    items = list(items)
+    if (len(items) <= 1 or max_concurrency <= 1
+            or getattr(_API_WORKER_STATE, "is_worker", False)):
+        for item in items:
+            yield item, func(item)
+        return
+
+    executor = _get_api_executor()
+    remaining = iter(items)
+    pending = {
+        executor.submit(func, item): item
+        for item in itertools.islice(remaining, max_concurrency)}
+    try:
+        while pending:
+            done, _ = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                for new in itertools.islice(remaining, 1):
+                    pending[executor.submit(func, new)] = new
+                yield item, future.result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def map_api_calls(
+        func: Callable[[T], R], items: Iterable[T],
+        max_concurrency: int=MAX_CONCURRENT_REQUESTS) -> list[R]:
+    """ Same as `iter_api_calls()`, but returns the list of results in the
+    order of the given items, re-raising the first error encountered. """
+    items = list(items)
+    results: list = [None] * len(items)
+    for i, res in iter_api_calls(
+            lambda i: func(items[i]), range(len(items)),
+            max_concurrency=max_concurrency):
+        results[i] = res
+    return results